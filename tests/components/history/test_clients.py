@@ -0,0 +1,26 @@
+"""Tests for the clients of history data."""
+
+import sqlite3
+
+import pytest
+
+from vehicletracker.components.history.clients import FileHistoryDataSource, read_sql_query_chunks
+from vehicletracker.helpers.tracing import Tracer
+
+def test_sql_chunks_are_traced():
+    """Test that each chunk of a streamed query is read within a span of the call."""
+    connection = sqlite3.connect(':memory:')
+    connection.execute('create table dwell (value integer)')
+    connection.executemany('insert into dwell values (?)', [(value,) for value in range(5)])
+    tracer = Tracer('test', sample_rate=1.0)
+
+    with tracer.span('call'):
+        chunks = [chunk['value'].tolist() for chunk in read_sql_query_chunks('select value from dwell', connection, 2)]
+
+    assert chunks == [[0, 1], [2, 3], [4]]
+    assert [span['name'] for span in reversed(tracer.spans())] == ['sql', 'sql_chunk', 'sql_chunk', 'sql_chunk', 'sql_chunk', 'call']
+
+def test_dwell_times_not_available():
+    """Test that data sources without dwell times fail with a clear error."""
+    with pytest.raises(NotImplementedError, match='FileHistoryDataSource'):
+        FileHistoryDataSource().dwell_time_from_to_stream({})
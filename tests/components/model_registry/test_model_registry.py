@@ -9,6 +9,11 @@ from vehicletracker.core import VehicleTrackerNode, async_setup_component
 async def test_mock_model():
     """Set up things to be run when tests are started."""
     CONFIG = {
+        'node': {
+            'transport': {
+                'type': 'memory'
+            }
+        },
         model_registry.DOMAIN: {
             model_registry.ATTR_MODELS: [
                 {
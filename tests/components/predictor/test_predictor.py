@@ -0,0 +1,24 @@
+"""Tests for the predictor component."""
+
+from datetime import datetime, timedelta, timezone
+
+from vehicletracker.components.predictor import Predictor
+
+class MockModelStore():
+
+    def __init__(self):
+        self.times = []
+
+    def list_models(self, model_name, spatial_ref, temporal_ref):
+        self.times.append(temporal_ref)
+        return []
+
+def test_predict_time_is_independent_of_transport():
+    """Test that a time given as datetime, e.g. by the in-memory transport, equals its ISO 8601 string."""
+    predictor = Predictor(None, {})
+    predictor.link_model_store = store = MockModelStore()
+    time = datetime(2020, 7, 28, 4, 0, tzinfo=timezone(timedelta(hours=2)))
+
+    assert predictor.predict({'linkRef': '1', 'time': time}) == []
+    assert predictor.predict({'linkRef': '1', 'time': time.isoformat()}) == []
+    assert store.times == [time, time]
@@ -1,15 +1,23 @@
 """Tests for the model_registry component."""
 
+import asyncio
+
 import pytest
 
 from vehicletracker.components import model_registry
 from vehicletracker.components import trainer
 from vehicletracker.core import VehicleTrackerNode, async_setup_component
+from vehicletracker.helpers.clock import SPEED_STEP
 
 @pytest.mark.asyncio
 async def test_mock_model():
     """Set up things to be run when tests are started."""
     CONFIG = {
+        'node': {
+            'transport': {
+                'type': 'memory'
+            }
+        },
         model_registry.DOMAIN: {
             model_registry.ATTR_MODELS: [
                 {
@@ -26,4 +34,31 @@ async def test_mock_model():
 
     
 
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_job_times_follow_node_clock():
+    """Test that train jobs are timed by the clock of the node, e.g. when simulated."""
+    CONFIG = {
+        'node': {
+            'transport': {'type': 'memory'},
+            'discovery': {'grace_period': 0},
+            'clock': {'start': '2020-07-28T04:00:00', 'speed': SPEED_STEP}
+        },
+        trainer.DOMAIN: {}
+    }
+    node = VehicleTrackerNode(CONFIG)
+    assert await async_setup_component(node, trainer.DOMAIN, CONFIG) == True
+    await node.async_start()
+
+    assert await node.services.async_call('link_model_schedule_train', {
+        'linkRef': 'link-1', 'model': 'MockModel', 'parameters': {}}, timeout=1) == {'jobId': 1}
+    for _ in range(100):
+        jobs = await node.services.async_call('list_trainer_jobs', timeout=1)
+        if jobs[0]['status'] == 'failed':
+            break
+        await asyncio.sleep(0.05)
+
+    assert jobs[0]['started'] == '2020-07-28T04:00:00'
+    assert jobs[0]['stopped'] == '2020-07-28T04:00:00'
     await node.async_stop()
@@ -1,5 +1,7 @@
 """Tests for the model_registry component."""
 
+import asyncio
+
 import pytest
 
 from vehicletracker.components import model_registry
@@ -11,6 +13,14 @@ from vehicletracker.core import VehicleTrackerNode, async_setup_component, _LOGG
 async def test_mock_model():
     """Set up things to be run when tests are started."""
     CONFIG = {
+        'node': {
+            'transport': {
+                'type': 'memory'
+            },
+            'discovery': {
+                'grace_period': 0
+            }
+        },
         model_registry.DOMAIN: {
             model_registry.ATTR_MODELS: [
                 {
@@ -29,12 +39,26 @@ async def test_mock_model():
 
     await node.async_start()
 
-    job = await node.services.async_call('schedule_train_model', {
+    job = await node.services.async_call('link_model_schedule_train', {
+        'linkRef': 'link-1',
         'model': 'MockModel',
         'time': '2020-07-28 00:00:00',
         'parameters': {}
     }, timeout=1)
 
-    assert job['jobId'] == 1
-    
+    assert job == {'jobId': 1}
+
+    # Without a history component there is no data to train on, so the
+    # job runs and fails
+    for _ in range(100):
+        jobs = await node.services.async_call('list_trainer_jobs', timeout=1)
+        if jobs[0]['status'] == 'failed':
+            break
+        await asyncio.sleep(0.05)
+
+    assert [job['jobId'] for job in jobs] == [1]
+    assert jobs[0]['input']['linkRef'] == 'link-1'
+    assert jobs[0]['status'] == 'failed'
+    assert 'service_unavailable' in jobs[0]['error']
+
     await node.async_stop()
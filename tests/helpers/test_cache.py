@@ -0,0 +1,74 @@
+"""Tests for the service result cache."""
+
+import asyncio
+import json
+
+import pytest
+
+from vehicletracker.helpers.cache import CachePolicy, ResultCache, default_key
+
+@pytest.mark.asyncio
+async def test_result_cache():
+    """Test that results are cached by key, evicted and not cached on error."""
+    calls = []
+
+    def call(result):
+        async def _call():
+            calls.append(result)
+            return result
+        return _call
+
+    cache = ResultCache(CachePolicy(ttl=60, max_entries=2, key=lambda data: data['key']))
+
+    assert await cache.async_get({'key': 1, 'other': 1}, call('a')) == 'a'
+    assert await cache.async_get({'key': 1, 'other': 2}, call('b')) == 'a'
+    assert await cache.async_get({'key': 2}, call({'error': 'timeout'})) == {'error': 'timeout'}
+    assert await cache.async_get({'key': 2}, call('c')) == 'c'
+    assert await cache.async_get({'key': 3}, call('d')) == 'd'
+    # The least recently used entry has been evicted
+    assert await cache.async_get({'key': 1}, call('e')) == 'e'
+
+    assert calls == ['a', {'error': 'timeout'}, 'c', 'd', 'e']
+    assert cache.stats == {'hits': 1, 'misses': 5, 'coalesced': 0, 'entries': 2}
+
+@pytest.mark.asyncio
+async def test_result_cache_expires():
+    """Test that results are no longer served once expired."""
+    cache = ResultCache(CachePolicy(ttl=0.01))
+
+    async def call():
+        return object()
+
+    first = await cache.async_get({}, call)
+    assert await cache.async_get({}, call) is first
+    await asyncio.sleep(0.02)
+    assert await cache.async_get({}, call) is not first
+
+@pytest.mark.asyncio
+async def test_result_cache_coalesces_calls():
+    """Test that concurrent identical calls share a single call."""
+    cache = ResultCache(CachePolicy(ttl=60))
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(cache.async_get({'value': 1}, call) for _ in range(3)))
+    assert results == [1, 1, 1]
+    assert calls == 1
+    assert cache.stats['coalesced'] == 2
+
+def test_cache_policy_config():
+    """Test that policies are configured by the path of their key function, unless it has none."""
+    config = CachePolicy(ttl=60, key=default_key).to_config()
+    assert config == {'ttl': 60, 'max_entries': 1024}
+    assert CachePolicy.from_config(config).key is default_key
+
+    config = CachePolicy(ttl=60, max_entries=10, key=json.dumps).to_config()
+    assert config == {'ttl': 60, 'max_entries': 10, 'key': 'json.dumps'}
+    assert CachePolicy.from_config(config).key is json.dumps
+
+    assert CachePolicy(ttl=60, key=lambda data: data['key']).to_config() is None
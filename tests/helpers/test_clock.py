@@ -0,0 +1,93 @@
+"""Tests for the clocks."""
+
+import asyncio
+
+import pytest
+
+from vehicletracker.core import VehicleTrackerNode
+from vehicletracker.helpers import datetime as dt_util
+from vehicletracker.helpers.clock import SPEED_STEP, VirtualClock
+from vehicletracker.helpers.scheduler import Scheduler
+
+def run_job(target, *args):
+    target(*args)
+
+@pytest.mark.asyncio
+async def test_virtual_clock_runs_faster():
+    """Test that jobs are due according to an accelerated clock."""
+    clock = VirtualClock(asyncio.get_running_loop(), 0, 1000)
+    scheduler = Scheduler(asyncio.get_running_loop(), run_job, clock)
+    fired = []
+
+    scheduler.call_at(60, fired.append, 'minute')
+    await asyncio.sleep(0.1)
+    assert fired == ['minute']
+    assert clock.time() >= 60
+    scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_step_clock_advances_when_told():
+    """Test that a stepped clock stands still, and due jobs run as it is advanced."""
+    clock = VirtualClock(asyncio.get_running_loop(), 0, SPEED_STEP)
+    scheduler = Scheduler(asyncio.get_running_loop(), run_job, clock)
+    fired = []
+
+    scheduler.call_at(10, fired.append, 'first')
+    scheduler.call_at(3600, fired.append, 'second')
+    await asyncio.sleep(0.01)
+    assert clock.time() == 0
+    assert not fired
+
+    clock.advance(10)
+    await asyncio.sleep(0.01)
+    assert fired == ['first']
+
+    clock.advance_to(5)
+    assert clock.time() == 10
+
+    clock.advance_to(7200)
+    await asyncio.sleep(0.01)
+    assert fired == ['first', 'second']
+    scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_node_clock():
+    """Test that the time of the node follows its clock."""
+    node = VehicleTrackerNode({'node': {
+        'transport': {'type': 'memory'},
+        'clock': {'start': '2020-07-28T04:00:00', 'speed': SPEED_STEP}}})
+    await node.async_start()
+
+    assert dt_util.as_local(dt_util.utcnow()).isoformat() == '2020-07-28T04:00:00+02:00'
+    node.clock.advance(60)
+    assert dt_util.now().isoformat() == '2020-07-28T04:01:00+02:00'
+
+    # The time of other nodes and tests is that of the wall clock again
+    await node.async_stop()
+    assert dt_util.utcnow().year > 2020
+
+@pytest.mark.asyncio
+async def test_step_clock_follows_events():
+    """Test that a stepped node clock advances to the time of consumed events."""
+    node = VehicleTrackerNode({'node': {
+        'transport': {'type': 'memory'},
+        'clock': {'start': '2020-07-28T04:00:00', 'speed': SPEED_STEP}}})
+    await node.async_start()
+    start = node.clock.time()
+    fired = []
+    node.scheduler.call_at(start + 30, fired.append, 'due')
+
+    async def listener(event_type, event):
+        fired.append(dt_util.now().isoformat())
+
+    await node.events.async_listen('arrival', listener)
+    await node.events.async_publish('arrival', {'time': '2020-07-28T04:01:00'})
+    await node.events.async_publish('arrival', {'time': start + 10})
+    await node.events.async_publish('arrival', {'journeyRef': '1'})
+    await asyncio.sleep(0.1)
+    await node.async_block_till_done()
+
+    # The clock never goes back, and events without a time leave it be
+    assert sorted(fired) == ['2020-07-28T04:01:00+02:00'] * 3 + ['due']
+    await node.async_stop()
+    assert dt_util.utcnow().year > 2020
@@ -0,0 +1,62 @@
+"""Tests for the message codecs."""
+
+import datetime
+import decimal
+
+import numpy as np
+import pytest
+
+from vehicletracker.helpers.codec import (CONTENT_TYPE_JSON,
+                                          CONTENT_TYPE_MSGPACK, get_codec)
+
+@pytest.mark.parametrize('content_type', [CONTENT_TYPE_JSON, CONTENT_TYPE_MSGPACK])
+def test_roundtrip(content_type):
+    """Test encoding of datetimes, decimals and NumPy types."""
+    codec = get_codec(content_type)
+    assert codec.content_type == content_type
+
+    data = {
+        'time': datetime.datetime(2020, 7, 28, 12, 30, tzinfo=datetime.timezone.utc),
+        'date': datetime.date(2020, 7, 28),
+        'amount': decimal.Decimal('1.5'),
+        'predicted': np.float64(12.5),
+        'count': np.int64(3),
+        'values': np.arange(3),
+    }
+    result = codec.decode(codec.encode(data))
+
+    assert list(result.pop('values')) == [0, 1, 2]
+    assert result == {
+        'time': '2020-07-28T12:30:00+00:00',
+        'date': '2020-07-28',
+        'amount': 1.5,
+        'predicted': 12.5,
+        'count': 3,
+    }
+
+def test_unknown_content_type():
+    """Test that an unknown content type is rejected."""
+    with pytest.raises(ValueError):
+        get_codec('text/plain')
+
+def test_msgpack_arrays():
+    """Test that NumPy arrays are decoded as NumPy arrays by the binary codec."""
+    codec = get_codec(CONTENT_TYPE_MSGPACK)
+
+    data = {
+        'time': np.arange(5, dtype=np.int64),
+        'matrix': np.ones((2, 3), dtype=np.float32),
+        'strided': np.arange(6)[::2],
+        'labels': np.array(['a', 'b'], dtype=object),
+    }
+    result = codec.decode(codec.encode(data))
+
+    assert isinstance(result['time'], np.ndarray)
+    np.testing.assert_array_equal(result['time'], data['time'])
+    assert result['matrix'].dtype == np.float32
+    assert result['matrix'].shape == (2, 3)
+    # Handlers may modify their input in place
+    result['matrix'][0, 0] = 2
+    np.testing.assert_array_equal(result['strided'], [0, 2, 4])
+    # Arrays of objects have no raw representation and fall back to lists
+    assert result['labels'] == ['a', 'b']
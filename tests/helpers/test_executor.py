@@ -0,0 +1,100 @@
+"""Tests for the bounded executors."""
+
+import asyncio
+import functools
+import threading
+
+import pytest
+
+from vehicletracker.exceptions import ExecutorFull
+from vehicletracker.helpers.executor import (POLICY_DEFER, BoundedExecutor,
+                                             ProcessExecutor, component_of)
+
+def test_component_of():
+    """Test that jobs are attributed to the component defining them."""
+    from vehicletracker.helpers.topic import routing_key
+
+    def job():
+        pass
+    job.__module__ = 'vehicletracker.components.history.clients'
+
+    assert component_of(job) == 'history'
+    assert component_of(functools.partial(job, 1)) == 'history'
+    assert component_of(routing_key) is None
+    assert component_of(print) is None
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_full():
+    """Test that jobs are rejected once the queue is full."""
+    executor = BoundedExecutor('test', max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: 'queued')
+    rejected = executor.submit(lambda: 'rejected')
+
+    with pytest.raises(ExecutorFull):
+        await rejected
+    assert executor.stats['queued'] == 1
+
+    release.set()
+    assert await running
+    assert await queued == 'queued'
+    assert executor.stats['rejected'] == 1
+    assert executor.stats['completed'] == 2
+    assert executor.stats['max_queued'] == 1
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_executor_defers_when_full():
+    """Test that jobs wait for room in the queue, and queued jobs run by priority."""
+    executor = BoundedExecutor('test', max_workers=1, max_queue=2, policy=POLICY_DEFER)
+    release = threading.Event()
+    order = []
+
+    jobs = [executor.submit(release.wait)]
+    jobs.append(executor.submit(order.append, 'low', priority=0))
+    jobs.append(executor.submit(order.append, 'high', priority=2))
+    jobs.append(executor.submit(order.append, 'deferred', priority=1))
+    assert executor.stats['queued'] == 2
+    assert executor.stats['deferred'] == 1
+
+    release.set()
+    await asyncio.gather(*jobs)
+    assert order == ['high', 'deferred', 'low']
+    assert executor.stats['rejected'] == 0
+    assert executor.stats['wait_count'] == 4
+    assert executor.stats['wait_max'] > 0
+    executor.shutdown()
+
+@pytest.mark.asyncio
+async def test_executor_shutdown():
+    """Test that queued jobs are cancelled and running jobs complete, while the event loop runs."""
+    executor = BoundedExecutor('test', max_workers=1)
+    release = threading.Event()
+
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: 'queued')
+    shutdown = asyncio.ensure_future(executor.async_shutdown())
+    await asyncio.sleep(0.01)
+
+    assert queued.cancelled()
+    assert executor.stats['queued'] == 0
+    assert not shutdown.done()
+    # The event loop is not blocked while waiting for the running job
+    release.set()
+    await shutdown
+    assert await running
+
+def square(value):
+    return value * value
+
+@pytest.mark.asyncio
+async def test_process_executor():
+    """Test that jobs run in warmed up worker processes."""
+    executor = ProcessExecutor('test', max_workers=2, preload=['json'])
+    await executor.async_warm_up()
+
+    assert await asyncio.gather(*(executor.submit(square, i) for i in range(4))) == [0, 1, 4, 9]
+    assert executor.stats['completed'] == 4
+    executor.shutdown()
@@ -0,0 +1,24 @@
+"""Tests for the hedging helpers."""
+
+from vehicletracker.helpers.hedging import HedgePolicy, LatencyWindow
+
+def test_latency_window():
+    """Test percentiles of the most recent latencies."""
+    latencies = LatencyWindow(size=100)
+    for latency in range(200):
+        latencies.add(latency)
+
+    assert len(latencies) == 100
+    assert latencies.percentile(50) == 149
+    assert latencies.percentile(95) == 194
+    assert latencies.percentile(100) == 199
+
+def test_hedge_policy():
+    """Test that the hedge delay follows the percentile once enough latencies are known."""
+    policy = HedgePolicy(delay=0.5, percentile=90, min_samples=10)
+    latencies = LatencyWindow()
+
+    assert policy.hedge_delay(latencies) == 0.5
+    for latency in range(1, 11):
+        latencies.add(latency / 10)
+    assert policy.hedge_delay(latencies) == 0.9
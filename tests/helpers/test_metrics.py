@@ -0,0 +1,44 @@
+"""Tests for the metrics of a node."""
+
+import math
+
+from vehicletracker.helpers.metrics import GAUGE, Histogram, Metrics
+
+def test_histogram():
+    """Test that values are counted by bucket and quantiles are bounded by buckets."""
+    histogram = Histogram([0.1, 1.0])
+    for value in [0.05, 0.1, 0.5, 2.0]:
+        histogram.observe(value)
+
+    assert histogram.count == 4
+    assert histogram.sum == 2.65
+    assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (math.inf, 4)]
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.75) == 1.0
+    assert histogram.quantile(1.0) == math.inf
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_render():
+    """Test that metrics are rendered in the Prometheus text format."""
+    metrics = Metrics()
+    metrics.describe('in_flight', GAUGE, "Requests being handled.")
+    metrics.inc('requests_total', {'service': 'echo'})
+    metrics.inc('requests_total', {'service': 'echo'})
+    metrics.add_collector(lambda metrics: metrics.set('in_flight', 3))
+    metrics.observe('latency_seconds', 0.2, {'service': 'echo'}, [0.1, 1.0])
+
+    assert metrics.render().splitlines() == [
+        '# HELP vehicletracker_in_flight Requests being handled.',
+        '# TYPE vehicletracker_in_flight gauge',
+        'vehicletracker_in_flight 3.0',
+        '# TYPE vehicletracker_latency_seconds histogram',
+        'vehicletracker_latency_seconds_bucket{service="echo",le="0.1"} 0',
+        'vehicletracker_latency_seconds_bucket{service="echo",le="1.0"} 1',
+        'vehicletracker_latency_seconds_bucket{service="echo",le="+Inf"} 1',
+        'vehicletracker_latency_seconds_sum{service="echo"} 0.2',
+        'vehicletracker_latency_seconds_count{service="echo"} 1',
+        '# TYPE vehicletracker_requests_total counter',
+        'vehicletracker_requests_total{service="echo"} 2.0',
+    ]
+    assert metrics.as_dict()['requests_total'] == {
+        'type': 'counter', 'samples': [{'labels': {'service': 'echo'}, 'value': 2}]}
@@ -0,0 +1,51 @@
+"""Tests for the scheduler."""
+
+import asyncio
+import time
+
+import pytest
+
+from vehicletracker.helpers import scheduler as scheduler_module
+from vehicletracker.helpers.scheduler import Scheduler
+
+def run_job(target, *args):
+    target(*args)
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_due_jobs_in_order():
+    """Test that jobs run in order of their time, and cancelled jobs do not run."""
+    scheduler = Scheduler(asyncio.get_running_loop(), run_job)
+    now = time.time()
+    order = []
+
+    scheduler.call_at(now + 0.02, order.append, 'second')
+    scheduler.call_at(now + 0.01, order.append, 'first')
+    cancelled = scheduler.call_at(now + 0.01, order.append, 'cancelled')
+    scheduler.call_at(now + 3600, order.append, 'later')
+    scheduler.cancel(cancelled)
+    assert len(scheduler) == 3
+
+    await asyncio.sleep(0.05)
+    assert order == ['first', 'second']
+    assert len(scheduler) == 1
+    assert scheduler.wakeups <= 2
+    scheduler.stop()
+
+@pytest.mark.asyncio
+async def test_scheduler_notices_rollback(monkeypatch):
+    """Test that rollback listeners are called when the wall clock rolls back."""
+    monkeypatch.setattr(scheduler_module, 'MAX_SLEEP', 0.01)
+    scheduler = Scheduler(asyncio.get_running_loop(), run_job)
+    offset = 0
+    monkeypatch.setattr(scheduler, 'time', lambda: time.time() + offset)
+    rollbacks = []
+    scheduler.add_rollback_listener(lambda: rollbacks.append(True))
+
+    scheduler.call_at(time.time() + 3600, print)
+    await asyncio.sleep(0.03)
+    assert not rollbacks
+
+    offset = -60
+    await asyncio.sleep(0.03)
+    assert rollbacks == [True]
+    scheduler.stop()
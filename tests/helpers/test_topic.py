@@ -0,0 +1,50 @@
+"""Tests for the topic routing helpers."""
+
+import pytest
+
+from vehicletracker.helpers.topic import TopicTrie, routing_key, topic_matches
+
+@pytest.mark.parametrize('pattern,routing_key,expected', [
+    ('arrival', 'arrival', True),
+    ('arrival.#', 'arrival', True),
+    ('arrival.#', 'arrival.10.1234', True),
+    ('arrival.*', 'arrival', False),
+    ('arrival.*', 'arrival.10', True),
+    ('arrival.*.1234', 'arrival.10.1234', True),
+    ('arrival.*.1234', 'arrival.10.4321', False),
+    ('#', 'departure.10', True),
+    ('#.1234', 'arrival.10.1234', True),
+    ('departure.#', 'arrival', False),
+])
+def test_topic_matches(pattern, routing_key, expected):
+    """Test matching of routing keys against topic patterns."""
+    assert topic_matches(pattern, routing_key) == expected
+
+    trie = TopicTrie()
+    trie.add(pattern, 'target')
+    assert trie.match(routing_key) == (('target',) if expected else ())
+
+def test_topic_trie():
+    """Test that the trie matches each pattern once and forgets removed targets."""
+    trie = TopicTrie()
+    trie.add('arrival.#', 'all_arrivals')
+    trie.add('arrival.10.#', 'line_10')
+    trie.add('#', 'everything')
+    trie.add('#.#', 'everything_twice')
+
+    assert set(trie.match('arrival.10.1234')) == {'all_arrivals', 'line_10', 'everything', 'everything_twice'}
+    assert set(trie.match('arrival.15.1234')) == {'all_arrivals', 'everything', 'everything_twice'}
+    assert len(trie.match('arrival.15.1234')) == 3
+
+    trie.remove('arrival.10.#', 'line_10')
+    assert 'arrival.10.#' not in trie
+    assert set(trie.match('arrival.10.1234')) == {'all_arrivals', 'everything', 'everything_twice'}
+
+    with pytest.raises(ValueError):
+        trie.remove('arrival.10.#', 'line_10')
+
+def test_routing_key():
+    """Test that words are escaped so they cannot span or match several words."""
+    assert routing_key('arrival', '4A', 1234) == 'arrival.4A.1234'
+    assert routing_key('arrival', None, 'a.b') == 'arrival._.a_b'
+    assert routing_key('arrival', '*', '#') == 'arrival._._'
@@ -0,0 +1,29 @@
+"""Tests for the tracing of service calls."""
+
+import json
+
+from vehicletracker.helpers.tracing import Tracer
+
+def test_spans_are_written(tmp_path):
+    """Test that spans are appended to the file by the writer, all written once closed."""
+    path = tmp_path / 'spans.jsonl'
+    tracer = Tracer('test', sample_rate=1.0, path=str(path))
+
+    for index in range(100):
+        with tracer.span('call', index=index):
+            pass
+    tracer.close()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span['attributes']['index'] for span in spans] == list(range(100))
+    assert spans == list(reversed(tracer.spans()))
+
+def test_unwritable_path(tmp_path):
+    """Test that spans are still recorded when the file cannot be opened."""
+    tracer = Tracer('test', sample_rate=1.0, path=str(tmp_path / 'missing' / 'spans.jsonl'))
+
+    with tracer.span('call'):
+        pass
+    tracer.close()
+
+    assert [span['name'] for span in tracer.spans()] == ['call']
@@ -0,0 +1,36 @@
+"""Tests for the event loop watchdog."""
+
+import asyncio
+import time
+
+import pytest
+
+from vehicletracker.helpers.metrics import Metrics
+from vehicletracker.helpers.watchdog import LoopWatchdog
+
+def stall_loop():
+    """Block the event loop, like a blocking call in a callback."""
+    time.sleep(0.2)
+
+@pytest.mark.asyncio
+async def test_stall_is_recorded():
+    """Test that lag is measured and the offender of a stall is recorded with its stack."""
+    metrics = Metrics()
+    watchdog = LoopWatchdog(asyncio.get_running_loop(), metrics, interval=0.01, threshold=0.05)
+    watchdog.start()
+
+    await asyncio.sleep(0.05)
+    assert not watchdog.recent_stalls()
+
+    stall_loop()
+    await asyncio.sleep(0.05)
+    watchdog.stop()
+
+    stalls = watchdog.recent_stalls()
+    assert len(stalls) == 1
+    assert 'stall_loop' in stalls[0]['offender']
+    assert any('time.sleep(0.2)' in line for line in stalls[0]['stack'])
+    assert stalls[0]['duration'] >= 0.1
+    assert metrics.get('loop_stalls_total') == 1
+    assert watchdog.lag.count >= 5
+    assert 'vehicletracker_loop_lag_quantile_seconds{quantile="0.99"}' in metrics.render()
@@ -14,3 +14,40 @@ class MockModel():
     
     def restore(self, model_store, metadata):
         pass
+
+def test_models_are_imported_lazily():
+    """Test that models are imported on first use, and resolve to their classes."""
+    import subprocess
+    import sys
+
+    # A fresh interpreter, as other tests may have imported the models already
+    script = '\n'.join([
+        'import inspect, sys',
+        'import vehicletracker.models',
+        "assert 'vehicletracker.models.WeeklySvr' not in sys.modules",
+        "assert 'sklearn' not in sys.modules",
+        'from vehicletracker.models import WeeklySvr',
+        "assert 'vehicletracker.models.WeeklySvr' in sys.modules",
+        "assert 'sklearn' in sys.modules",
+        'assert inspect.isclass(WeeklySvr)',
+        'assert vehicletracker.models.WeeklySvr is WeeklySvr',
+    ])
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=False)
+    assert result.returncode == 0, result.stderr
+
+def test_dwell_time_chunks_are_encoded():
+    """Test that streamed dwell times are combined, with stop points numbered in sorted order."""
+    from vehicletracker.models.dwell_time import DwellTimeModel
+
+    class MockServices():
+        def call_stream(self, service_name, service_data):
+            yield {'time': [1, 2], 'stopPointRef': ['b', 'a'], 'delay': [0, 1], 'isTimingPoint': [1, 0], 'dwellTime': [3, 4]}
+            yield {'time': [3], 'stopPointRef': ['c'], 'delay': [0], 'isTimingPoint': [1], 'dwellTime': [5]}
+
+    class MockNode():
+        services = MockServices()
+
+    data, labels = DwellTimeModel(MockNode()).dwell_time_from_to('2020-01-01', '2020-01-02')
+    assert labels == {'stopPointRef': ['a', 'b', 'c']}
+    assert data['stopPointRef'].tolist() == [1, 0, 2]
+    assert data['dwellTime'].tolist() == [3, 4, 5]
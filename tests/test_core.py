@@ -0,0 +1,599 @@
+"""Tests for the core components of Vehicle Tracker."""
+
+import asyncio
+import collections
+import time
+
+import pytest
+
+from vehicletracker.core import (VehicleTrackerNode, async_setup_component,
+                                 cpu_bound, remaining_time)
+from vehicletracker.helpers.cache import CachePolicy
+from vehicletracker.helpers.tracing import span
+from vehicletracker.transport import LANE_BULK, LANE_REALTIME, LANE_RPC
+
+def value_key(service_data):
+    """Cache key of the test services, ignoring all but the value."""
+    return service_data['value']
+
+CONFIG = {
+    'node': {
+        'transport': {
+            'type': 'memory'
+        }
+    }
+}
+
+@pytest.mark.asyncio
+async def test_service_call():
+    """Test that a registered service can be called over the in-memory transport."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    def echo(service_data):
+        return service_data
+
+    await node.services.async_register('test', 'echo', echo)
+
+    assert await node.services.async_call('echo', {'value': 1}, timeout=1) == {'value': 1}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_late_reply_is_dropped():
+    """Test that replies without a pending call are dropped."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    reply_to = await node.services._async_reply_address(LANE_RPC) # pylint: disable=protected-access
+    await node.events.async_reply('reply', {'correlationId': 'unknown', 'result': None}, to_node = reply_to)
+    await node.async_block_till_done()
+
+    assert await node.services.async_call('unknown_service', timeout=0.1) == {'error': 'timeout'}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_service_call_stream():
+    """Test that chunks of a streaming service are consumed with flow control."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    produced = []
+
+    def count(service_data):
+        for i in range(service_data['n']):
+            produced.append(i)
+            yield i
+
+    await node.services.async_register('test', 'count', count)
+
+    consumed = []
+    async for chunk in node.services.async_call_stream('count', {'n': 10}, timeout=1, window=2):
+        # The service may never be more than the window ahead
+        assert len(produced) - len(consumed) <= 3
+        consumed.append(chunk)
+    assert consumed == list(range(10))
+
+    # Callers not streaming get all chunks at once
+    assert await node.services.async_call('count', {'n': 3}, timeout=1) == [0, 1, 2]
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_remove_listener():
+    """Test that removed listeners no longer receive events."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    events = []
+
+    async def listener(event_type, event_data):
+        events.append((event_type, event_data))
+
+    node.async_track_tasks()
+    remove_listener = await node.events.async_listen('test_event', listener)
+    await node.events.async_publish('test_event', {'value': 1})
+    await node.async_block_till_done()
+    assert events == [('test_event', {'value': 1})]
+
+    remove_listener()
+    await node.events.async_publish('test_event', {'value': 2})
+    await node.async_block_till_done()
+    assert len(events) == 1
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_listen_routing_key():
+    """Test that listeners can narrow an event type by its routing key."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    all_events = []
+    line_events = []
+
+    async def all_listener(event_type, event_data):
+        all_events.append((event_type, event_data))
+
+    async def line_listener(event_type, event_data):
+        line_events.append((event_type, event_data))
+
+    node.async_track_tasks()
+    await node.events.async_listen('arrival', all_listener)
+    await node.events.async_listen('arrival.4A', line_listener)
+    await node.events.async_publish('arrival', {'value': 1}, 'arrival.4A.1234')
+    await node.events.async_publish('arrival', {'value': 2}, 'arrival.5C.4321')
+    await node.async_block_till_done()
+
+    assert all_events == [('arrival', {'value': 1}), ('arrival', {'value': 2})]
+    assert line_events == [('arrival', {'value': 1})]
+    await node.async_stop()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('node_config,max_concurrency', [
+    ({'services': {'slow': {'max_concurrency': 2}}}, None),
+    ({'domains': {'test': {'prefetch_count': 2}}}, None),
+    ({}, 2),
+])
+async def test_service_concurrency_limit(node_config, max_concurrency):
+    """Test that a service handles no more requests at a time than configured."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], **node_config}})
+    await node.async_start()
+
+    active = 0
+    max_active = 0
+
+    async def slow(service_data):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return service_data
+
+    await node.services.async_register('test', 'slow', slow, max_concurrency)
+
+    results = await asyncio.gather(*(node.services.async_call('slow', {'value': i}, timeout=1) for i in range(5)))
+    assert results == [{'value': i} for i in range(5)]
+    assert max_active == 2
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_lane_priority():
+    """Test that queued events are consumed by the priority of their lane."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'lanes': {'bulk_event': LANE_BULK}}})
+    await node.async_start()
+
+    events = []
+
+    async def listener(event_type, event_data):
+        events.append(event_type)
+
+    node.async_track_tasks()
+    await node.events.async_listen('*', listener)
+    await node.events.async_publish('bulk_event', {})
+    await node.events.async_publish('rpc_event', {}, lane = LANE_RPC)
+    await node.events.async_publish('realtime_event', {})
+    await node.async_block_till_done()
+
+    assert node.events.lane('bulk_event') == LANE_BULK
+    assert node.events.lane('realtime_event') == LANE_REALTIME
+    assert events == ['realtime_event', 'rpc_event', 'bulk_event']
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_stale_events_are_dropped():
+    """Test that expired and stale events are not handled after a stall."""
+    node = VehicleTrackerNode({'node': {
+        **CONFIG['node'],
+        'domains': {'test': {'prefetch_count': 1}},
+        'events': {'stale_event': {'max_age': 0.01}},
+    }})
+    await node.async_start()
+
+    events = []
+
+    async def listener(event_type, event_data):
+        if event_type == 'stall_event':
+            await asyncio.sleep(0.05)
+        events.append(event_type)
+
+    node.async_track_tasks()
+    await node.events.async_listen_domain('test', '*', listener)
+    await node.events.async_publish('stall_event', {})
+    await node.events.async_publish('stale_event', {})
+    await node.events.async_publish('expired_event', {}, expiration = 0.01)
+    await node.events.async_publish('fresh_event', {})
+    await node.async_block_till_done()
+
+    assert events == ['stall_event', 'fresh_event']
+    assert node.events.dropped_events == {'stale_event': 1}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_service_call_cache():
+    """Test that cached services are called once for identical calls."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    calls = 0
+
+    def count(service_data):
+        nonlocal calls
+        calls += 1
+        return calls
+
+    await node.services.async_register('test', 'count', count, cache=CachePolicy(ttl=60))
+
+    results = await asyncio.gather(*(node.services.async_call('count', {'value': 1}, timeout=1) for _ in range(3)))
+    assert results == [1, 1, 1]
+    assert await node.services.async_call('count', {'value': 1}, timeout=1) == 1
+    assert await node.services.async_call('count', {'value': 2}, timeout=1) == 2
+    assert node.services.cache_stats == {'count': {'hits': 1, 'misses': 2, 'coalesced': 2, 'entries': 2}}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_service_deadline():
+    """Test that handlers know their remaining time and expired requests are skipped."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    def budget(service_data):
+        return remaining_time()
+
+    async def slow(service_data):
+        await asyncio.sleep(0.05)
+        return remaining_time()
+
+    await node.services.async_register('test', 'budget', budget)
+    await node.services.async_register('test', 'slow', slow, max_concurrency=1)
+
+    assert 0 < await node.services.async_call('budget', timeout=1) <= 1
+
+    results = await asyncio.gather(
+        node.services.async_call('slow', timeout=1),
+        node.services.async_call('slow', timeout=0.02))
+    assert 0 < results[0] <= 1
+    assert results[1] == {'error': 'timeout'}
+
+    await asyncio.sleep(0.05)
+    assert node.services.expired_requests == {'slow': 1}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_service_call_hedging():
+    """Test that a slow call is hedged to another replica and the first reply is taken."""
+    node = VehicleTrackerNode({'node': {
+        **CONFIG['node'],
+        'services': {'flaky': {'hedge': {'delay': 0.01}}},
+    }})
+    await node.async_start()
+
+    calls = 0
+
+    async def flaky(service_data):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await asyncio.sleep(0.2)
+        return calls
+
+    node.async_track_tasks()
+    await node.services.async_register('test', 'flaky', flaky)
+    await node.async_block_till_done()
+
+    # A second replica, reached through another reply queue of this node
+    own = node.services._replicas['flaky'][node.name]
+    other = await node.services._async_reply_address(LANE_REALTIME)
+    node.services._replicas['flaky']['other'] = type(own)(other, 1, own.expires)
+
+    addressed = []
+    async_reply = node.events.async_reply
+
+    async def spy(event_type, event_data, to_node, *args, **kwargs):
+        if event_type == 'service_request':
+            addressed.append(to_node)
+        await async_reply(event_type, event_data, to_node, *args, **kwargs)
+
+    node.events.async_reply = spy
+
+    assert await node.services.async_call('flaky', timeout=1) == 2
+    assert node.services.hedged_requests == {'flaky': 1}
+    # The hedge is sent to a replica other than the slow one
+    assert addressed == [own.address, other]
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_unavailable_service_fails_fast():
+    """Test that calls to services no node offers fail without waiting for the timeout."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'discovery': {'grace_period': 0}}})
+    # The grace period starts once the node has started, e.g. after setup
+    assert node.services.async_service_available('unknown_service')
+    await node.async_start()
+
+    def echo(service_data):
+        return service_data
+
+    await node.services.async_register('test', 'echo', echo)
+
+    assert node.services.async_service_available('echo')
+    assert not node.services.async_service_available('unknown_service')
+    assert await node.services.async_call('unknown_service', timeout=10) == {'error': 'service_unavailable'}
+    assert await node.services.async_call('echo', {'value': 1}, timeout=1) == {'value': 1}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_executor_queue_full():
+    """Test that service requests fail once the queue of the executor is full."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'executors': {'default': {'max_workers': 1, 'max_queue': 0}}}})
+    await node.async_start()
+
+    def slow(service_data):
+        time.sleep(0.05)
+        return service_data
+
+    await node.services.async_register('test', 'slow', slow)
+
+    results = await asyncio.gather(*(node.services.async_call('slow', {'value': i}, timeout=1) for i in range(2)))
+    assert results[0] == {'value': 0}
+    assert 'error' in results[1]
+    assert node.executors.stats['default']['rejected'] == 1
+    await node.async_stop()
+
+@cpu_bound
+def process_id(service_data):
+    import os
+    return os.getpid()
+
+@pytest.mark.asyncio
+async def test_cpu_bound_service():
+    """Test that CPU-bound services are handled in a worker process."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'executors': {'process': {'max_workers': 1}}}})
+    await node.async_start()
+
+    await node.services.async_register('test', 'process_id', process_id)
+
+    import os
+    assert await node.services.async_call('process_id', timeout=10) not in (os.getpid(), None)
+    assert node.executors.stats['process']['completed'] == 1
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_reported():
+    """Test that workers blocked by nested calls are reported, and coroutine handlers are not."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    def echo(service_data):
+        return service_data
+
+    def blocking_echo(service_data):
+        return node.services.call('echo', service_data, timeout=1)
+
+    async def async_echo(service_data):
+        return await node.services.async_call('echo', service_data, timeout=1)
+
+    await node.services.async_register('test', 'echo', echo)
+    await node.services.async_register('test', 'blocking_echo', blocking_echo)
+    await node.services.async_register('test', 'async_echo', async_echo)
+
+    assert await node.services.async_call('async_echo', {'value': 1}, timeout=1) == {'value': 1}
+    assert node.executors.stats['default']['blocked_total'] == 0
+    assert await node.services.async_call('blocking_echo', {'value': 1}, timeout=1) == {'value': 1}
+    assert node.executors.stats['default']['blocked_total'] == 1
+    assert node.executors.stats['default']['blocked'] == 0
+
+    with pytest.raises(RuntimeError):
+        node.services.call('echo', {'value': 1}, timeout=1)
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_done_tasks_are_not_retained():
+    """Test that tracked tasks are forgotten once done, and waiting for them does not spin."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+    node.async_track_tasks()
+
+    async def job():
+        await asyncio.sleep(0.01)
+
+    for _ in range(100):
+        node.async_create_task(job())
+    assert node.task_stats['pending'] == 100
+
+    await node.async_block_till_done()
+    assert node.task_stats['pending'] == 0
+    assert node.task_stats['tracked_total'] >= 100
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_services_wait_for_readiness():
+    """Test that services of a component still loading its data are offered once it is ready."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'discovery': {'grace_period': 0}}})
+    await node.async_start()
+    node.async_track_tasks()
+
+    def echo(service_data):
+        return service_data
+
+    def echo_module(service_data):
+        return service_data
+    echo_module.__module__ = 'vehicletracker.components.warming'
+
+    node.async_set_warming('warming')
+    assert not node.async_is_ready('warming')
+    await node.services.async_register('test', 'echo', echo, component='warming')
+    await node.services.async_register('test', 'echo_module', echo_module)
+    # Waiting for the component does not hold up waiting for pending work
+    await asyncio.wait_for(node.async_block_till_done(), 1)
+    assert not node.services.async_service_available('echo')
+    assert not node.services.async_service_available('echo_module')
+
+    node.async_set_ready('warming')
+    assert node.async_is_ready('warming')
+    assert await node.async_wait_ready('warming')
+    await asyncio.sleep(0.01)
+    assert node.services.async_service_available('echo')
+    assert node.services.async_service_available('echo_module')
+    assert await node.services.async_call('echo', {'value': 1}, timeout=1) == {'value': 1}
+    assert 'ready' in node.setup_times['warming']
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_failed_dependency_is_not_waited_for():
+    """Test that a component is not set up when a component it depends on failed."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+
+    assert node.async_is_ready('unknown')
+    node.async_set_ready('failing', False)
+    assert not await node.async_wait_ready('failing')
+    assert not await async_setup_component(node, 'http', {}, ['failing'])
+    assert not node.async_is_ready('http')
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_service_metrics():
+    """Test that latencies, errors and events of services are recorded, and offered as a service."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+    assert await async_setup_component(node, 'metrics', {'metrics': None})
+
+    def echo(service_data):
+        return service_data
+
+    def fail(service_data):
+        raise ValueError()
+
+    await node.services.async_register('test', 'echo', echo)
+    await node.services.async_register('test', 'fail', fail)
+
+    assert await node.services.async_call('echo', {'value': 1}, timeout=1) == {'value': 1}
+    assert await node.services.async_call('fail', timeout=1) == {'error': ''}
+
+    assert node.metrics.get('service_latency_seconds', {'service': 'echo'}).count == 1
+    assert node.metrics.get('service_call_latency_seconds', {'service': 'echo'}).count == 1
+    assert node.metrics.get('service_errors_total', {'service': 'fail'}) == 1
+    assert node.metrics.get('service_in_flight', {'service': 'echo'}) == 0
+    assert node.metrics.get('events_published_total', {'event_type': 'echo'}) == 1
+    assert node.metrics.get('events_consumed_total', {'event_type': 'echo'}) == 1
+
+    result = await node.services.async_call('metrics', timeout=1)
+    assert result['node'] == 'default'
+    assert 'executor_wait_seconds' in result['metrics']
+    text = await node.services.async_call('metrics', {'format': 'prometheus'}, timeout=1)
+    assert 'vehicletracker_service_latency_seconds_count{service="echo"} 1' in text
+
+    # The metrics and traces of a specific node, or of all nodes
+    result = await node.services.async_call_node('metrics', 'default', timeout=1)
+    assert result['node'] == 'default'
+    assert await node.services.async_call_node('metrics', 'other', timeout=1) == {'error': 'service_unavailable'}
+    assert await node.services.async_call_all('traces', timeout=1) == {'default': {'node': 'default', 'spans': []}}
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_nested_calls_are_traced():
+    """Test that spans of nested calls join the trace of the outer call."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'tracing': {'sample_rate': 1.0}}})
+    await node.async_start()
+
+    def inner(service_data):
+        with span('load_model'):
+            return service_data
+
+    async def outer(service_data):
+        return await node.services.async_call('inner', service_data, timeout=1)
+
+    await node.services.async_register('test', 'inner', inner)
+    await node.services.async_register('test', 'outer', outer)
+    assert await node.services.async_call('outer', {'value': 1}, timeout=1) == {'value': 1}
+
+    spans = node.tracer.spans()
+    assert len({span['traceId'] for span in spans}) == 1
+    by_name = collections.defaultdict(list)
+    for recorded in spans:
+        by_name[recorded['name'], recorded['attributes'].get('service')].append(recorded)
+    for name in ['call', 'publish', 'transit', 'queue', 'handle', 'reply']:
+        assert len(by_name[name, 'outer']) == 1
+        assert len(by_name[name, 'inner']) == 1
+    outer_call = by_name['call', 'outer'][0]
+    assert outer_call['parentId'] is None
+    assert by_name['handle', 'outer'][0]['parentId'] == outer_call['spanId']
+    assert by_name['call', 'inner'][0]['parentId'] == by_name['handle', 'outer'][0]['spanId']
+    assert by_name['load_model', None][0]['parentId'] == by_name['handle', 'inner'][0]['spanId']
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_unsampled_calls_are_not_traced():
+    """Test that no spans are recorded of traces not sampled."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'tracing': {'sample_rate': 0}}})
+    await node.async_start()
+
+    def echo(service_data):
+        return service_data
+
+    await node.services.async_register('test', 'echo', echo)
+    assert await node.services.async_call('echo', {'value': 1}, timeout=1) == {'value': 1}
+    assert node.tracer.spans() == []
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_publish_local_from_worker():
+    """Test that blocking listeners may publish local events to other blocking listeners."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+    received = asyncio.Event()
+
+    def forward(event_type, event_data):
+        node.events.publish_local('forwarded', event_data)
+
+    def receive(event_type, event_data):
+        node.loop.call_soon_threadsafe(received.set)
+
+    await node.events.async_listen('original', forward)
+    await node.events.async_listen('forwarded', receive)
+    node.events.publish_local('original', {})
+    await asyncio.wait_for(received.wait(), 1)
+
+    # Jobs submitted from a worker thread are handed over to the event loop
+    result = await node.async_add_job(lambda: node.executors.default.submit(abs, -1).result(timeout=1))
+    assert result == 1
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_services_registered_while_advertising_stay_available():
+    """Test that services registered after the advertisement was sent are not forgotten on receipt."""
+    node = VehicleTrackerNode({'node': {**CONFIG['node'], 'discovery': {'grace_period': 0}}})
+    await node.async_start()
+
+    def echo(service_data):
+        return service_data
+
+    for service in ['echo_1', 'echo_2', 'echo_3']:
+        await node.services.async_register('test', service, echo)
+    await asyncio.sleep(0.05)
+
+    for service in ['echo_1', 'echo_2', 'echo_3']:
+        assert node.services.async_service_available(service)
+    await node.async_stop()
+
+@pytest.mark.asyncio
+async def test_cache_policy_is_advertised():
+    """Test that the cache policy of a service is advertised to and installed by callers on other nodes."""
+    node = VehicleTrackerNode(CONFIG)
+    await node.async_start()
+    adverts = []
+
+    async def listener(event_type, event_data):
+        adverts.append(event_data)
+
+    await node.events.async_listen('service_load', listener)
+    await node.services.async_register('test', 'count', lambda service_data: 1, cache=CachePolicy(ttl=60, key=value_key))
+    await node.services._async_publish_load()
+    await asyncio.sleep(0.05)
+
+    cache_config = {'ttl': 60, 'max_entries': 1024, 'key': 'tests.test_core.value_key'}
+    assert adverts[-1]['caches'] == {'count': cache_config}
+
+    # E.g. the advertisement of a predictor reaching a monitor
+    node.services._async_handle_load('service_load', {
+        'node': 'other', 'address': 'other', 'services': ['remote'], 'load': 0, 'caches': {'remote': cache_config}})
+    assert 'remote' in node.services.cache_stats
+    await node.async_stop()
@@ -7,6 +7,7 @@ import os
 import subprocess
 import sys
 import threading
+import time
 from concurrent.futures import ThreadPoolExecutor
 from typing import TYPE_CHECKING, Any, Dict, List
 
@@ -97,6 +98,11 @@ def get_arguments() -> argparse.Namespace:
         action="store_true",
         help=f"On restart exit with code {RESTART_EXIT_CODE}",
     )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report the time spent importing and setting up each component, then stop.",
+    )
     if os.name == "posix":
         parser.add_argument(
             "--daemon", action="store_true", help="Run Home Assistant as daemon"
@@ -117,8 +123,21 @@ def cmdline() -> List[str]:
 
     return [arg for arg in sys.argv if arg != "--daemon"]
 
-async def setup_and_run_node(config_file) -> int:
+# How long to wait for components to be ready when profiling startup
+PROFILE_READY_TIMEOUT = 300
+
+def report_startup(setup_times: Dict[str, Dict[str, float]], started: float, total: float) -> None:
+    """Print the time spent importing and setting up each component, and until it was ready."""
+    print(f"{'Component':<24}{'Import (s)':>12}{'Setup (s)':>12}{'Ready (s)':>12}")
+    for domain, times in sorted(setup_times.items(), key=lambda item: -item[1].get('ready', float('inf'))):
+        row = [f"{times[key]:>12.3f}" if key in times else f"{'-':>12}" for key in ('import', 'setup', 'ready')]
+        print(f"{domain:<24}{''.join(row)}")
+    print(f"{'Node start':<24}{started:>36.3f}")
+    print(f"{'Total':<24}{total:>36.3f}")
+
+async def setup_and_run_node(config_file, profile_startup: bool = False) -> int:
     """Set up node and run."""
+    start = time.perf_counter()
     import logging
     from colorlog import ColoredFormatter
 
@@ -158,7 +177,21 @@ async def setup_and_run_node(config_file) -> int:
     node = core.VehicleTrackerNode(config)
     await core.async_setup_components(node, config)
 
-    return await node.async_run()
+    if not profile_startup:
+        return await node.async_run()
+
+    setup_done = time.perf_counter()
+    run = asyncio.ensure_future(node.async_run(attach_signals=False))
+    while node.state != core.NodeState.running and not run.done():
+        await asyncio.sleep(0.01)
+    try:
+        await asyncio.wait_for(asyncio.gather(
+            *(node.async_wait_ready(domain) for domain in node.setup_times)), PROFILE_READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"Components not ready within {PROFILE_READY_TIMEOUT} seconds.")
+    report_startup(node.setup_times, time.perf_counter() - setup_done, time.perf_counter() - start)
+    await node.async_stop()
+    return await run
 
 def main() -> int:
     """Start Vehicle Tracker."""
@@ -179,7 +212,7 @@ def main() -> int:
     config_file = os.path.join(os.getcwd(), args.config)
 
     asyncio.set_event_loop_policy(EventLoopPolicy(False))
-    exit_code = asyncio.run(setup_and_run_node(config_file))
+    exit_code = asyncio.run(setup_and_run_node(config_file, args.profile_startup))
     #if exit_code == RESTART_EXIT_CODE and not args.runner:
     #    try_to_restart()
 
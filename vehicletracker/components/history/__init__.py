@@ -10,6 +10,7 @@ import pandas as pd
 import importlib
 
 from vehicletracker.core import callback, VehicleTrackerNode
+from vehicletracker.helpers.cache import CachePolicy
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -17,6 +18,8 @@ DOMAIN = 'history'
 ATTR_DATA_SOURCE = 'data_source'
 ATTR_CLASS = 'class'
 
+CALENDAR_CACHE_TTL = 3600
+
 async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):    
     """Setup history component"""
 
@@ -31,11 +34,13 @@ async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):
     if hasattr(client, 'async_setup'):
         await node.async_add_job(client.async_setup, node, client_config)
 
-    await node.services.async_register(DOMAIN, 'calendar', client.calendar)  
+    await node.services.async_register(DOMAIN, 'calendar', client.calendar,
+        cache=CachePolicy(CALENDAR_CACHE_TTL))
     await node.services.async_register(DOMAIN, 'link_travel_time', client.link_travel_time_from_to)
     await node.services.async_register(DOMAIN, 'link_travel_time_n_preceding_normal_days', client.link_travel_time_n_preceding_normal_days)
     await node.services.async_register(DOMAIN, 'link_travel_time_special_days', client.link_travel_time_special_days)
 
     await node.services.async_register(DOMAIN, 'dwell_time_from_to', client.dwell_time_from_to)
+    await node.services.async_register(DOMAIN, 'dwell_time_from_to_stream', client.dwell_time_from_to_stream)
 
     return True
@@ -1,5 +1,6 @@
 """Different clients for reading history data"""
 
+import itertools
 import logging
 from typing import (Any, Dict)
 
@@ -7,12 +8,39 @@ import numpy as np
 import pandas as pd
 
 from vehicletracker.core import VehicleTrackerNode
+from vehicletracker.helpers.tracing import span
 
 _LOGGER = logging.getLogger(__name__)
 
+# Number of rows in each chunk of a streamed result
+DWELL_TIME_CHUNK_SIZE = 50000
+
+def read_sql_query(sql, engine, **kwargs):
+    """Read the result of a query, traced as a span of the service call."""
+    with span('sql'):
+        return pd.read_sql_query(sql, engine, **kwargs)
+
+def read_sql_query_chunks(sql, engine, chunksize, **kwargs):
+    """Read the result of a query in chunks of `chunksize` rows, each read traced as a span of the service call."""
+    with span('sql'):
+        chunks = pd.read_sql_query(sql, engine, chunksize=chunksize, **kwargs)
+    for index in itertools.count():
+        with span('sql_chunk', chunk=index):
+            data = next(chunks, None)
+        if data is None:
+            return
+        yield data
+
 class HistoryDataSource():
+    """Base class of history data sources."""
+
     def dwell_time_from_to(self, params):
-        pass
+        """Get dwell times, with stop points factorized."""
+        raise NotImplementedError(f"Dwell times are not available from {type(self).__name__}")
+
+    def dwell_time_from_to_stream(self, params):
+        """Get dwell times as a stream of chunks."""
+        raise NotImplementedError(f"Dwell times are not available from {type(self).__name__}")
 
 class MssqlHistoryDataSource(HistoryDataSource):
     """History data directly from MS SQL Data Warehouse"""
@@ -30,7 +58,7 @@ class MssqlHistoryDataSource(HistoryDataSource):
         from_date = pd.to_datetime(params['fromDate'])
         to_date = pd.to_datetime(params['toDate'])
 
-        data = pd.read_sql_query(
+        data = read_sql_query(
             'exec api.RT_VehicleTracker_Calendar @fromDate = ?, @toDate = ?',
             self.engine,
             params=[from_date, to_date])
@@ -53,14 +81,14 @@ class MssqlHistoryDataSource(HistoryDataSource):
         from_time = pd.to_datetime(params['fromTime'])
         to_time = pd.to_datetime(params['toTime'])
 
-        data = pd.read_sql_query(
+        data = read_sql_query(
             'exec api.RT_VehicleTracker_LinkTavelTime @linkRef = ?, @fromTime = ?, @toTime = ?',
             self.engine,
             params=[link_ref, from_time, to_time])
 
         result = {
-            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist()
+            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values
         }
 
         _LOGGER.debug(f"returning {len(data)} results")
@@ -72,14 +100,14 @@ class MssqlHistoryDataSource(HistoryDataSource):
         time = pd.to_datetime(params['time'])
         n = int(params['n'])
 
-        data = pd.read_sql_query(
+        data = read_sql_query(
             'exec api.RT_VehicleTracker_LinkTavelTime_NPrecedingNormalDays @linkRef = ?, @time = ?, @n = ?',
             self.engine,
             params=[link_ref, time, n])
 
         result = {
-            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist()
+            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values
         }
 
         _LOGGER.debug(f"returning {len(data)} results")
@@ -91,14 +119,14 @@ class MssqlHistoryDataSource(HistoryDataSource):
         from_time = pd.to_datetime(params['fromTime'])
         to_time = pd.to_datetime(params['toTime'])
 
-        data = pd.read_sql_query(
+        data = read_sql_query(
             'exec api.RT_VehicleTracker_LinkTavelTime_SpecialDays @fromTime = ?, @toTime = ?, @linkRef = ?',
             self.engine,
             params=[from_time, to_time, link_ref])
 
         result = {
-            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist(),
+            'time': np.diff(np.hstack((0, data['time'].astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values,
             'day_type': data['day_type'].values.tolist()
         }
 
@@ -106,7 +134,7 @@ class MssqlHistoryDataSource(HistoryDataSource):
 
         return result
 
-    def dwell_time_from_to(self, params):
+    def _dwell_time_sql(self, params):
         from_time = pd.to_datetime(params['fromTime'])
         to_time = pd.to_datetime(params['toTime'])
 
@@ -135,7 +163,10 @@ class MssqlHistoryDataSource(HistoryDataSource):
         else:
             raise ValueError('Must provide lineRef and/or stopPointRef')
 
-        data = pd.read_sql_query(sql, self.engine)
+        return sql
+
+    def dwell_time_from_to(self, params):
+        data = read_sql_query(self._dwell_time_sql(params), self.engine)
         stop_point_ref, stop_point_ref_labels = data['stop_point_ref'].astype(str).factorize(sort=True)
         epoch = pd.Timestamp("1970-01-01")
 
@@ -144,16 +175,34 @@ class MssqlHistoryDataSource(HistoryDataSource):
                 'stopPointRef': stop_point_ref_labels.tolist()
             },
             'data': {
-                'time': ((data['time'] - epoch) // pd.Timedelta('1s')).tolist(),
-                'stopPointRef': stop_point_ref.tolist(),    
-                'delay': data['delay'].tolist(),
-                'isTimingPoint': data['is_timing_point'].tolist(),
-                'dwellTime': data['dwell_time'].tolist(),
+                'time': ((data['time'] - epoch) // pd.Timedelta('1s')).values,
+                'stopPointRef': stop_point_ref,
+                'delay': data['delay'].values,
+                'isTimingPoint': data['is_timing_point'].values,
+                'dwellTime': data['dwell_time'].values,
             } 
         }
         return result
 
-class FileHistoryDataSource():
+    def dwell_time_from_to_stream(self, params):
+        """Get dwell times as a stream of chunks of at most `chunkSize` rows.
+
+        Stop points are not factorized, since the labels are not known until
+        the last chunk has been read.
+        """
+        chunk_size = int(params.get('chunkSize', DWELL_TIME_CHUNK_SIZE))
+        epoch = pd.Timestamp("1970-01-01")
+
+        for data in read_sql_query_chunks(self._dwell_time_sql(params), self.engine, chunk_size):
+            yield {
+                'time': ((data['time'] - epoch) // pd.Timedelta('1s')).values,
+                'stopPointRef': data['stop_point_ref'].astype(str).values.tolist(),
+                'delay': data['delay'].values,
+                'isTimingPoint': data['is_timing_point'].values,
+                'dwellTime': data['dwell_time'].values,
+            }
+
+class FileHistoryDataSource(HistoryDataSource):
     """Local travel time history loaded from CSV-files"""
 
     def __init__(self):
@@ -186,8 +235,8 @@ class FileHistoryDataSource():
 
         data = self.link_travel_time[from_time:to_time - pd.to_timedelta('1ns')][lambda x: x['link_ref'] == link_ref]
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist(),
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values,
             #'day_type': data['day_type'].values.tolist()
         }
         
@@ -207,8 +256,8 @@ class FileHistoryDataSource():
         data = self.link_travel_time[lambda x: (x['link_ref'] == link_ref) & (x['date'].isin(dates))]
 
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist()
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values
         }
 
         _LOGGER.debug(f"returning {len(data)} results")
@@ -226,8 +275,8 @@ class FileHistoryDataSource():
 
         data = self.link_travel_time[from_time:to_time - pd.to_timedelta('1ns')][lambda x: (x['link_ref'] == link_ref) & (x['day_type'] != x['day'])]
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist(),
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values,
             'day_type': data['day_type'].values.tolist()
         }
         
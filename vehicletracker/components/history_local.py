@@ -4,21 +4,29 @@ import logging
 from datetime import datetime
 from typing import (Any, Dict)
 
+import numpy as np
+import pandas as pd
+
 from vehicletracker.core import callback, VehicleTrackerNode
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'history'
+# Configured as a component of its own, offering the services of 'history'
+COMPONENT = 'history_local'
+
+# Ready once the history is loaded
+READY_ON_SETUP = False
 
 async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):    
     """Setup history component"""
 
     client = LocalTravelTimeHistory()
-    node.add_job(client.preload)
+    node.async_add_warm_up_job(COMPONENT, client.preload)
 
-    await node.services.async_register(DOMAIN, 'link_travel_time', client.link_travel_time_from_to)
-    await node.services.async_register(DOMAIN, 'link_travel_time_n_preceding_normal_days', client.link_travel_time_n_preceding_normal_days)
-    await node.services.async_register(DOMAIN, 'link_travel_time_special_days', client.link_travel_time_special_days)
+    await node.services.async_register(DOMAIN, 'link_travel_time', client.link_travel_time_from_to, component=COMPONENT)
+    await node.services.async_register(DOMAIN, 'link_travel_time_n_preceding_normal_days', client.link_travel_time_n_preceding_normal_days, component=COMPONENT)
+    await node.services.async_register(DOMAIN, 'link_travel_time_special_days', client.link_travel_time_special_days, component=COMPONENT)
 
     return True
 
@@ -55,8 +63,8 @@ class LocalTravelTimeHistory():
 
         data = self.link_travel_time[from_time:to_time - pd.to_timedelta('1ns')][lambda x: x['link_ref'] == link_ref]
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist(),
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values,
             #'day_type': data['day_type'].values.tolist()
         }
         
@@ -76,8 +84,8 @@ class LocalTravelTimeHistory():
         data = self.link_travel_time[lambda x: (x['link_ref'] == link_ref) & (x['date'].isin(dates))]
 
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist()
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values
         }
 
         _LOGGER.debug(f"returning {len(data)} results")
@@ -95,8 +103,8 @@ class LocalTravelTimeHistory():
 
         data = self.link_travel_time[from_time:to_time - pd.to_timedelta('1ns')][lambda x: (x['link_ref'] == link_ref) & (x['day_type'] != x['day'])]
         result = {
-            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))).tolist(),
-            'link_travel_time': data['link_travel_time'].values.tolist(),
+            'time': np.diff(np.hstack((0, data.index.astype(np.int64) // 10**9))),
+            'link_travel_time': data['link_travel_time'].values,
             'day_type': data['day_type'].values.tolist()
         }
         
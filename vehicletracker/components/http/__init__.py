@@ -12,6 +12,10 @@ from aiohttp.web_exceptions import HTTPMovedPermanently
 import aiohttp_cors
 
 from vehicletracker.const import EVENT_REPLY, EVENT_TIME_CHANGED
+from vehicletracker.exceptions import ServiceCallError
+from vehicletracker.helpers.codec import CONTENT_TYPE_JSON, get_codec
+from vehicletracker.helpers.metrics import CONTENT_TYPE_PROMETHEUS
+from vehicletracker.helpers.topic import MATCH_ONE_WORD, WORD_SEPARATOR, routing_key
 
 DOMAIN = "http"
 
@@ -23,6 +27,24 @@ DEFAULT_SERVER_PORT = 5000
 STREAM_PING_EVENT = ('ping', {})
 STREAM_PING_INTERVAL = 50
 
+def get_event_pattern(request) -> str:
+    """Return the topic pattern to stream events for.
+
+    The event type can be narrowed to a line and/or a journey, e.g.
+    '?event_type=estimated_arrival&line=4A', so that only matching events are
+    routed to this node.
+    """
+    event_type = request.query.get('event_type', '*')
+    line = request.query.get('line')
+    journey_ref = request.query.get('journeyRef')
+    if line is None and journey_ref is None:
+        return event_type
+
+    words = [event_type, routing_key(line) if line is not None else MATCH_ONE_WORD]
+    if journey_ref is not None:
+        words.append(routing_key(journey_ref))
+    return WORD_SEPARATOR.join(words)
+
 async def async_setup(node, config):
     """Set up the HTTP API."""
     conf = config.get(DOMAIN) or {}
@@ -47,8 +69,7 @@ async def async_setup(node, config):
 
     node.http = server
 
-    async def service(request):
-        service = request.match_info['service']
+    async def get_service_data(request):
         service_data = {}
         
         if request.method == 'POST':
@@ -59,13 +80,79 @@ async def async_setup(node, config):
 
         for key, value in request.rel_url.query.items():
             service_data[key] = value
+        return service_data
+
+    async def service(request):
+        service = request.match_info['service']
+        service_data = await get_service_data(request)
         result = await node.services.async_call(
             service, service_data
         )
-        return web.json_response(result)
+        return web.Response(body=get_codec(CONTENT_TYPE_JSON).encode(result), content_type=CONTENT_TYPE_JSON)
+
+    async def service_stream(request):
+        """Stream the result of a service as newline delimited JSON chunks."""
+        service = request.match_info['service']
+        service_data = await get_service_data(request)
+        codec = get_codec(CONTENT_TYPE_JSON)
+
+        response = web.StreamResponse()
+        response.content_type = "application/x-ndjson"
+        await response.prepare(request)
+
+        try:
+            async for chunk in node.services.async_call_stream(service, service_data):
+                await response.write(codec.encode(chunk) + b'\n')
+        except ServiceCallError as ex:
+            await response.write(codec.encode({'error': ex.message}) + b'\n')
+
+        return response
 
     server.app.router.add_route('get', '/api/services/{service}', service)
     server.app.router.add_route('post', '/api/services/{service}', service)
+    server.app.router.add_route('get', '/api/services/{service}/stream', service_stream)
+    server.app.router.add_route('post', '/api/services/{service}/stream', service_stream)
+
+    async def metrics(request):
+        """Return the metrics of this node, or of the node named `node`, in the Prometheus text format unless JSON is asked for."""
+        as_json = request.query.get('format') == 'json'
+        node_name = request.query.get('node')
+        if node_name is None or node_name == node.name:
+            result = node.metrics.as_dict() if as_json else node.metrics.render()
+        else:
+            # Other nodes offer their metrics by the metrics component
+            result = await node.services.async_call_node('metrics', node_name, {} if as_json else {'format': 'prometheus'})
+            if isinstance(result, dict) and 'error' in result:
+                return web.Response(status=503,
+                    body=get_codec(CONTENT_TYPE_JSON).encode(result), content_type=CONTENT_TYPE_JSON)
+            if as_json:
+                result = result['metrics']
+
+        if as_json:
+            return web.Response(body=get_codec(CONTENT_TYPE_JSON).encode(result), content_type=CONTENT_TYPE_JSON)
+        response = web.Response(text=result)
+        response.headers['Content-Type'] = CONTENT_TYPE_PROMETHEUS
+        return response
+
+    server.app.router.add_route('get', '/api/metrics', metrics)
+
+    async def traces(request):
+        """Return the recent spans of sampled traces of all nodes, latest first, e.g. of a trace by `traceId`."""
+        service_data = await get_service_data(request)
+        results = await node.services.async_call_all('traces', service_data)
+        spans = []
+        for node_name, result in results.items():
+            if isinstance(result, dict) and 'error' in result:
+                _LOGGER.warning("Failed to get the spans of node '%s': %s", node_name, result['error'])
+                continue
+            spans.extend(result['spans'])
+        spans.sort(key=lambda span: span['start'], reverse=True)
+        return web.Response(body=get_codec(CONTENT_TYPE_JSON).encode({
+            'nodes': sorted(results),
+            'spans': spans,
+        }), content_type=CONTENT_TYPE_JSON)
+
+    server.app.router.add_route('get', '/api/traces', traces)
 
     async def event_stream(request):
         buffer = asyncio.Queue() 
@@ -82,7 +169,7 @@ async def async_setup(node, config):
         await response.prepare(request)
 
         unsub_stream = await node.events.async_listen(
-            request.query.get('event_type', '*'),
+            get_event_pattern(request),
             forward_events)
 
         try:
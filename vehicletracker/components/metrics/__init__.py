@@ -0,0 +1,59 @@
+"""Offer the metrics and traces of a node as services, e.g. on nodes without HTTP.
+
+Every node sets up this component to offer its own metrics and traces.
+Callers choose the node with `node.services.async_call_node`, or gather the
+results of all nodes with `node.services.async_call_all`, e.g. for the
+spans of a trace across nodes. A plain call reaches any one node.
+"""
+import logging
+from typing import Any, Dict
+
+from vehicletracker.const import ATTR_NODE_NAME
+from vehicletracker.core import VehicleTrackerNode, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+DOMAIN = 'metrics'
+
+FORMAT_PROMETHEUS = 'prometheus'
+
+# How many spans the 'traces' service returns by default
+DEFAULT_TRACES_LIMIT = 1000
+
+async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):
+    """Set up the metrics component."""
+
+    @callback
+    def metrics(service_data : Dict[str, Any]) -> Any:
+        """Return the metrics of this node, in the Prometheus text format if asked for."""
+        if service_data.get('format') == FORMAT_PROMETHEUS:
+            return node.metrics.render()
+        return {
+            ATTR_NODE_NAME: node.name,
+            'metrics': node.metrics.as_dict(),
+        }
+
+    @callback
+    def loop_stalls(service_data : Dict[str, Any]) -> Any:
+        """Return the recent stalls of the event loop of this node, with the offender and stack."""
+        return {
+            ATTR_NODE_NAME: node.name,
+            'stalls': node.watchdog.recent_stalls() if node.watchdog is not None else [],
+        }
+
+    @callback
+    def traces(service_data : Dict[str, Any]) -> Any:
+        """Return the recent spans of sampled traces on this node, optionally of a trace or by name."""
+        return {
+            ATTR_NODE_NAME: node.name,
+            'spans': node.tracer.spans(
+                service_data.get('traceId'),
+                service_data.get('name'),
+                int(service_data.get('limit', DEFAULT_TRACES_LIMIT))),
+        }
+
+    await node.services.async_register(DOMAIN, 'metrics', metrics)
+    await node.services.async_register(DOMAIN, 'traces', traces)
+    await node.services.async_register(DOMAIN, 'loop_stalls', loop_stalls)
+
+    return True
@@ -12,6 +12,9 @@ from vehicletracker.helpers.model_store import LocalModelStore
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'model_registry'
+
+# Ready once the cached models are loaded
+READY_ON_SETUP = False
 ATTR_MODELS = 'models'
 ATTR_NAME = 'name'
 ATTR_CLASS = 'class'
@@ -27,10 +30,10 @@ async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):
     component_config = config[DOMAIN]
     node.data[DOMAIN] = model_registry = ModelRegitry(node, component_config)
 
-    node.async_add_job(model_registry.restore_state)
-    await node.services.async_register(DOMAIN, 'list_model_classes', model_registry.list_model_classes)
-    await node.services.async_register(DOMAIN, 'list_models', model_registry.list_models)
-    await node.services.async_register(DOMAIN, 'link_models', model_registry.list_models) #TODO: Rename in frontend
+    node.async_add_warm_up_job(DOMAIN, model_registry.restore_state)
+    await node.services.async_register(DOMAIN, 'list_model_classes', model_registry.list_model_classes, component=DOMAIN)
+    await node.services.async_register(DOMAIN, 'list_models', model_registry.list_models, component=DOMAIN)
+    await node.services.async_register(DOMAIN, 'link_models', model_registry.list_models, component=DOMAIN) #TODO: Rename in frontend
 
     await node.events.async_listen('model_available', model_registry.model_available)
 
@@ -40,13 +43,22 @@ class ModelRegitry():
     def __init__(self, node : VehicleTrackerNode, config : Dict[str, Any]):
         self.node = node
         self.model_store = LocalModelStore(MODEL_CACHE_PATH)
-        self.model_classes = {}
-        for model_config in config[ATTR_MODELS]:
-            # Initialie client
-            model_module_name, model_class_name = model_config[ATTR_CLASS].rsplit(".", 1)
+        # Model classes are imported on first use, as models tend to depend
+        # on heavy libraries, e.g. TensorFlow
+        self.model_classes = {
+            model_config[ATTR_NAME]: model_config[ATTR_CLASS]
+            for model_config in config[ATTR_MODELS]
+        }
+
+    def get_model_class(self, model_name):
+        """Return the class of a model, importing it on first use."""
+        model_class = self.model_classes[model_name]
+        if isinstance(model_class, str):
+            model_module_name, model_class_name = model_class.rsplit(".", 1)
             model_class = getattr(importlib.import_module(model_module_name), model_class_name)
-            self.model_classes[model_config[ATTR_NAME]] = model_class
-        
+            self.model_classes[model_name] = model_class
+        return model_class
+
     def restore_state(self):
         """Restore models from persistent model store"""
         _LOGGER.info('Loading cached models from persistent store ...')
@@ -56,7 +68,7 @@ class ModelRegitry():
         model_name = model_metadata[METADATA_ATTR_MODEL_NAME]
 
         # Initialize a new instance from model_store
-        model = self.model_classes[model_name](self.node)
+        model = self.get_model_class(model_name)(self.node)
         model.restore(self.model_store, model_metadata)
         return model
 
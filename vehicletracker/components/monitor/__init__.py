@@ -4,18 +4,20 @@ import logging
 from datetime import datetime, timedelta
 from typing import (Any, Dict)
 import json
-from shapely import wkt
-from shapely.ops import linemerge
 
 from vehicletracker.core import callback, VehicleTrackerNode
 from vehicletracker.helpers.events import async_track_utc_time_change
-from vehicletracker.helpers.datetime import utcnow, parse_datetime, as_local, as_utc
+from vehicletracker.helpers.datetime import now, utcnow, parse_datetime, as_local, as_utc
 from vehicletracker.helpers.json import DateTimeEncoder
+from vehicletracker.helpers.topic import routing_key
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'monitor'
 
+# Journeys are loaded from the schedule, with predictions of their links
+DEPENDENCIES = ['schedule_loader', 'predictor']
+
 async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):    
     """Setup monitor component"""
 
@@ -35,10 +37,23 @@ async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):
     await node.services.async_register(DOMAIN, 'link_geometries', monitor.list_link_geometries)
     node.async_add_job(monitor.fetch_stop_points, utcnow())
     node.async_add_job(monitor.fetch_journeys, utcnow())
-    await async_track_utc_time_change(node, monitor.fetch_journeys, hour='*', minute='*', second=0)
+    async_track_utc_time_change(node, monitor.fetch_journeys, hour='*', minute='*', second=0)
 
     return True
 
+def ended_journeys(planned_ends, horizon):
+    """Return the references of the journeys planned to end before `horizon`."""
+    return [journey_ref for journey_ref, planned_end in planned_ends if parse_datetime(planned_end) < horizon]
+
+def parse_link_geometries(link_geometries):
+    """Parse the WKT of link geometries into shapes."""
+    # Shapely is only needed once geometries are loaded
+    from shapely import wkt
+
+    for link_geometry in link_geometries:
+        link_geometry['geometry'] = wkt.loads(link_geometry['geometryWkt'])
+    return link_geometries
+
 class Monitor():
 
     def __init__(self, node : VehicleTrackerNode, config : Dict[str, Any]):
@@ -110,7 +125,7 @@ class Monitor():
                     'Could not find link for journey: %s, sequence_number: %s.',
                     journey_ref, sequence_number)    
 
-    def updated_departure(self, event_type, event_data):
+    async def updated_departure(self, event_type, event_data):
         journey_ref = event_data['journeyRef']
         sequence_number = event_data['sequenceNumber']
         departure_time = parse_datetime(event_data['observedUtc']) if event_type == 'departure' else event_data['estimatedUtc']
@@ -128,7 +143,12 @@ class Monitor():
                 journey_ref, sequence_number) 
             return 
 
-        link_predictions = self.node.services.call('link_predict', { 'linkRef': link['linkRef'], 'time': as_local(departure_time) }) 
+        link_predictions = await self.node.services.async_call('link_predict', { 'linkRef': link['linkRef'], 'time': as_local(departure_time) }) 
+
+        if isinstance(link_predictions, dict) and 'error' in link_predictions:
+            # E.g. no predictor is available, which fails fast
+            _LOGGER.warning('Failed to predict link %s: %s', link['linkRef'], link_predictions['error'])
+            link_predictions = []
 
         if len(link_predictions) == 0:
             # Fallback to timetable
@@ -144,14 +164,16 @@ class Monitor():
 
         link['predictedTime'] = predicted
         link['predictedUpdated'] = utcnow()
-        link['predictions'] = link_predictions
+        # Copy, since the predictions may be shared through the result cache
+        link['predictions'] = [dict(pred) for pred in link_predictions]
 
         self.node.events.publish_local('estimated_arrival', {
             'journeyRef': journey_ref,
             'sequenceNumber': sequence_number + 1, #TODO: Not always correct!
             'estimatedUtc': departure_time + timedelta(seconds=predicted)
-        })
+        }, routing_key('estimated_arrival', journey.get('lineDesignation'), journey_ref))
 
+    @callback
     def updated_arrival(self, event_type, event_data): 
         """Event handler for 'arrival' and 'estimated_arrival'. Predicts dwell time and cascade downstream via estimated_departure event."""
         
@@ -189,7 +211,7 @@ class Monitor():
                     'journeyRef': journey_ref,
                     'sequenceNumber': sequence_number,
                     'estimatedUtc': arrival_time + timedelta(seconds=predicted)
-                })
+                }, routing_key('estimated_departure', journey.get('lineDesignation'), journey_ref))
 
         except StopIteration:
             _LOGGER.warning(
@@ -266,41 +288,45 @@ class Monitor():
 
     # Background worker methods
 
-    def fetch_stop_points(self, utc_time):   
-        self.stop_points = {str(x['stopPointRef']): x for x in self.node.services.call('load_stop_points')}
+    async def fetch_stop_points(self, utc_time):   
+        self.stop_points = {str(x['stopPointRef']): x for x in await self.node.services.async_call('load_stop_points')}
 
-    def fetch_journeys(self, utc_time):        
-        journeys = self.node.services.call('load_journeys', { 'fromDateTime': '?' })
+    async def fetch_journeys(self, utc_time):        
+        journeys = await self.node.services.async_call('load_journeys', { 'fromDateTime': '?' })
 
         new_journeys = 0
         for journey in journeys:
             if not journey['journeyRef'] in self.journey_map:
-                journey['stops'] = self.node.services.call('load_journey_stops', { 'journeyRef': journey['journeyRef'] })
-                journey['links'] = self.node.services.call('load_journey_links', { 'journeyRef': journey['journeyRef'] })
+                journey['stops'] = await self.node.services.async_call('load_journey_stops', { 'journeyRef': journey['journeyRef'] })
+                journey['links'] = await self.node.services.async_call('load_journey_links', { 'journeyRef': journey['journeyRef'] })
                 journey['added'] = utc_time
                 journey['totalDistance'] = journey['links'][-1]['totalDistance']                
                 self.journey_map[journey['journeyRef']] = journey
                 new_journeys += 1
 
-        removed_journey = 0
-        horizon = datetime.now() - timedelta(minutes=15)
-        for k in list(self.journey_map.keys()):
-            journey = self.journey_map[k]
-            
-            if parse_datetime(journey['plannedEndDateTime']) < horizon:
-                del self.journey_map[k]
-                removed_journey += 1
-                continue
-
-            if any([not link['linkRef'] in self.link_geometries for link in journey['links']]):
-                journey_link_geometries = self.node.services.call('load_link_geometry', { 'journeyRef': journey['journeyRef'] })
+        # Parsing runs in a worker, not to stall the event loop
+        horizon = now().replace(tzinfo=None) - timedelta(minutes=15)
+        planned_ends = [(k, journey['plannedEndDateTime']) for k, journey in self.journey_map.items()]
+        removed = await self.node.async_add_job(ended_journeys, planned_ends, horizon)
+        for k in removed:
+            self.journey_map.pop(k, None)
+
+        link_geometries = {}
+        for journey in list(self.journey_map.values()):
+            if any([not (link['linkRef'] in self.link_geometries or link['linkRef'] in link_geometries) for link in journey['links']]):
+                journey_link_geometries = await self.node.services.async_call('load_link_geometry', { 'journeyRef': journey['journeyRef'] })
                 for link_geometry in journey_link_geometries:
                     link_ref = link_geometry['linkRef']
-                    if not link_ref in self.link_geometries:
-                        link_geometry['geometry'] = wkt.loads(link_geometry['geometryWkt'])
-                        self.link_geometries[link_ref] = link_geometry
+                    if not (link_ref in self.link_geometries or link_ref in link_geometries):
+                        link_geometries[link_ref] = link_geometry
+        if link_geometries:
+            for link_geometry in await self.node.async_add_job(parse_link_geometries, list(link_geometries.values())):
+                self.link_geometries.setdefault(link_geometry['linkRef'], link_geometry)
 
-        _LOGGER.info('Loaded %s new journeys, removed %s journeys', new_journeys, removed_journey)
+        _LOGGER.info('Loaded %s new journeys, removed %s journeys', new_journeys, len(removed))
         # Dump cache if we stop...
+        await self.node.async_add_job(self.dump_journeys)
+
+    def dump_journeys(self):
         with open('cache/journeys.json', 'w') as f:
             f.write(self._json_encoder.encode(self.journey_map))
@@ -1,5 +1,6 @@
 """Vehicle Tracker Predictor Component"""
 
+import functools
 import logging
 from datetime import datetime
 
@@ -11,34 +12,67 @@ from typing import (
 import numpy as np
 import pandas as pd
 
-from vehicletracker.core import VehicleTrackerNode, callback
+from vehicletracker.core import VehicleTrackerNode, callback, cpu_bound
+from vehicletracker.helpers import datetime as dt_util
+from vehicletracker.helpers.cache import CachePolicy, default_key
 from vehicletracker.helpers.model_store import LocalModelStore
+from vehicletracker.helpers.tracing import span
 from vehicletracker.exceptions import ModelNotFound
 
 DOMAIN = 'predictor'
 
+# Ready once the cached models are loaded
+READY_ON_SETUP = False
+
 _LOGGER = logging.getLogger(__name__)
 
 LINK_MODEL_PATH = './cache/lt-link-travel-time/'
 
+# Predictions are shared by calls for the same link within the same minute
+LINK_PREDICT_CACHE_TTL = 60
+LINK_PREDICT_CACHE_MAX_ENTRIES = 10000
+LINK_MODELS_CACHE_TTL = 10
+
+# Predictions of at least this many points in time run in a worker process
+LINK_PREDICT_PROCESS_BATCH_SIZE = 1000
+# How many models each worker process keeps loaded
+LINK_PREDICT_PROCESS_MAX_MODELS = 64
+
 async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):    
     """Sets up the predictor component"""
 
     predictor = node.data[DOMAIN] = Predictor(node, config[DOMAIN])
     
-    node.async_add_job(predictor.restore_state)
+    node.async_add_warm_up_job(DOMAIN, predictor.restore_state)
 
     # Wire up events and services
-    await node.services.async_register(DOMAIN, 'link_predict', predictor.predict)
-    await node.services.async_register(DOMAIN, 'link_models', predictor.list_link_models)
+    await node.services.async_register(DOMAIN, 'link_predict', predictor.predict,
+        cache=CachePolicy(LINK_PREDICT_CACHE_TTL, LINK_PREDICT_CACHE_MAX_ENTRIES, link_predict_cache_key), component=DOMAIN)
+    await node.services.async_register(DOMAIN, 'link_models', predictor.list_link_models,
+        cache=CachePolicy(LINK_MODELS_CACHE_TTL), component=DOMAIN)
     await node.events.async_listen('link_model_available', predictor.link_model_available)    
 
     return True
 
+def link_predict_cache_key(service_data):
+    """Cache key of 'link_predict', equal for the same link and model within the same minute."""
+    time = service_data.get('time')
+    if time is None:
+        time = dt_util.now().replace(tzinfo=None)
+    elif isinstance(time, str):
+        time = datetime.fromisoformat(time)
+
+    if isinstance(time, datetime):
+        time = time.replace(second=0, microsecond=0).isoformat()
+    else:
+        time = default_key(time)
+    return (service_data['linkRef'], service_data.get('model'), time)
+
 class Predictor():
     """Predictor State"""
 
     def __init__(self, node, config):
+        self.node = node
         self.link_model_store = LocalModelStore(LINK_MODEL_PATH)
 
     def restore_state(self):
@@ -59,11 +93,16 @@ class Predictor():
         if isinstance(time, str):
             time_min = datetime.fromisoformat(time)
             time_ = [time_min]
-        elif isinstance(time, list):
+        elif isinstance(time, datetime):
+            # Handed over as is by the in-memory transport, and equal to
+            # the ISO 8601 string parsed above from other transports
+            time_min = time
+            time_ = [time_min]
+        elif isinstance(time, (list, np.ndarray)):
             time_ = pd.to_datetime(np.cumsum(time), unit='s')
             time_min = time_.min()
         else:
-            time_min = datetime.now()
+            time_min = dt_util.now().replace(tzinfo=None)
             time_ = [time_min]
 
         model_candidates = self.link_model_store.list_models(model_name, link_ref, time_min)
@@ -76,15 +115,19 @@ class Predictor():
             return []
 
         model_metadata = model_candidates[0]
-        model = self.link_model_store.get_model(model_metadata['ref'])
-
         index = pd.DatetimeIndex(time_)
-        pred = model.predict(index)
+
+        if len(index) >= LINK_PREDICT_PROCESS_BATCH_SIZE:
+            pred = self.node.run_job(predict_link_model, model_metadata['resourceUrl'], index)
+        else:
+            with span('load_model', model_ref=model_metadata['ref']):
+                model = self.link_model_store.get_model(model_metadata['ref'])
+            pred = model.predict(index)
 
         return [{
             'model': model_metadata['model'],
             'model_ref': model_metadata['ref'],
-            'predicted': np.round(np.squeeze(pred), 1) if len(time_) == 1 else list(np.round(np.squeeze(pred), 1))
+            'predicted': float(np.round(np.squeeze(pred), 1)) if len(time_) == 1 else np.round(np.squeeze(pred), 1)
         }]
 
     def list_link_models(self, service_data):        
@@ -99,3 +142,14 @@ class Predictor():
     def link_model_available(self, event_type, event_data):
         """Event callback for 'link_model_available'"""
         self.link_model_store.add_model(event_data['metadata'])
+
+@functools.lru_cache(maxsize=LINK_PREDICT_PROCESS_MAX_MODELS)
+def _load_link_model(model_path):
+    """Load a link model, kept loaded for later predictions by the same worker process."""
+    import joblib
+    return joblib.load(model_path)
+
+@cpu_bound
+def predict_link_model(model_path, index):
+    """Predict a link at the points in time of `index` using the model at `model_path`."""
+    return _load_link_model(model_path).predict(index)
@@ -7,18 +7,22 @@ from typing import (Any, Dict)
 import pandas as pd
 
 from vehicletracker.core import callback, VehicleTrackerNode
+from vehicletracker.helpers.cache import CachePolicy
 from vehicletracker.helpers.events import async_track_utc_time_change
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'schedule_loader'
 
+STOP_POINTS_CACHE_TTL = 300
+
 async def async_setup(node : VehicleTrackerNode, config : Dict[str, Any]):    
     """Setup schedule_loader component"""
 
     schedule_loader = node.data[DOMAIN] = DataWarehouseScheduleLoader(node, config[DOMAIN])
 
-    await node.services.async_register(DOMAIN, 'load_stop_points', schedule_loader.load_stop_points)
+    await node.services.async_register(DOMAIN, 'load_stop_points', schedule_loader.load_stop_points,
+        cache=CachePolicy(STOP_POINTS_CACHE_TTL))
     await node.services.async_register(DOMAIN, 'load_link_geometry', schedule_loader.load_link_geometry)
 
     await node.services.async_register(DOMAIN, 'load_journeys', schedule_loader.load_journeys)
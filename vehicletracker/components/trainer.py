@@ -6,14 +6,16 @@ import logging.config
 from typing import (Any, Dict)
 
 from vehicletracker.exceptions import ApplicationError
-from vehicletracker.core import VehicleTrackerNode
+from vehicletracker.core import VehicleTrackerNode, cpu_bound
+from vehicletracker.helpers import datetime as dt_util
 from vehicletracker.helpers.job_runner import LocalJobRunner
+from vehicletracker.helpers.topic import routing_key
 
-from datetime import datetime
 
 import yaml
 
 import json
+import numpy as np
 import pandas as pd
 
 DOMAIN = 'trainer'
@@ -61,16 +63,16 @@ class Trainer():
             'input': params
         }
 
-        def execute_train_job():
+        async def execute_train_job():
             try:
                 job_state['status'] = 'running'
-                job_state['started'] = datetime.now().isoformat()
-                job_state['result'] = self.train(job_state['input'])
+                job_state['started'] = dt_util.now().replace(tzinfo=None).isoformat()
+                job_state['result'] = await self.train(job_state['input'])
                 job_state['status'] = 'completed'
-                job_state['stopped'] = datetime.now().isoformat()
+                job_state['stopped'] = dt_util.now().replace(tzinfo=None).isoformat()
             except Exception as e: # pylint: disable=broad-except
                 job_state['status'] = 'failed'
-                job_state['stopped'] = datetime.now().isoformat()
+                job_state['stopped'] = dt_util.now().replace(tzinfo=None).isoformat()
                 job_state['error'] = str(e)
                 _LOGGER.exception('Error in execute_train_job')
 
@@ -80,10 +82,10 @@ class Trainer():
 
     
 
-    def train(self, params):
+    async def train(self, params):
         """Performs the actual execution of training"""
         link_ref = params['linkRef']
-        time = pd.to_datetime(params.get('time') or pd.datetime.now())
+        time = pd.to_datetime(params.get('time') or dt_util.now().replace(tzinfo=None))
         model_name = params['model']
         model_parameters = params.get('parameters', {})
 
@@ -99,13 +101,8 @@ class Trainer():
 
         _LOGGER.debug("Train link model for '%s' using model '%s' (hash: %s)", link_ref, model_name, model_hash_hex)
 
-        from vehicletracker.models import WeeklySvr
-        from vehicletracker.models import WeeklyHistoricalAverage
-
-        import joblib
-
         n = model_parameters.get('n', 21)
-        train_data = self.node.services.call('link_travel_time_n_preceding_normal_days', {
+        train_data = await self.node.services.async_call('link_travel_time_n_preceding_normal_days', {
             'linkRef': link_ref,
             'time': time.isoformat(),
             'n': n
@@ -117,31 +114,24 @@ class Trainer():
         if len(train_data['time']) == 0:
             raise ApplicationError(f"no train data returned for '{link_ref}' (time: {time.isoformat()}, {n})")
 
-        train = pd.DataFrame(train_data)
-        train.index = pd.to_datetime(train['time'].cumsum(), unit='s')
-        train.drop(columns = 'time', inplace=True)
-        _LOGGER.debug("Loaded train data: %s", train.shape[0])
+        # Time is delta encoded, link travel times are one column of targets.
+        train_index = pd.to_datetime(np.cumsum(train_data['time']), unit='s')
+        train_values = np.asarray(train_data['link_travel_time']).reshape(-1, 1)
+        _LOGGER.debug("Loaded train data: %s", len(train_index))
 
         metadata_file_name = f'{model_hash_hex}.json'
         model_file_name = f'{model_hash_hex}.joblib'
 
-        if model_name == 'svr':
-            weekly_svr = WeeklySvr(verbose = False)
-            weekly_svr.fit(train.index, train.values)
-            # Write model
-            joblib.dump(weekly_svr, os.path.join(MODEL_CACHE_PATH, model_file_name))
-        elif model_name == 'ha':
-            weekly_ha = WeeklyHistoricalAverage()
-            weekly_ha.fit(train.index, train.values)
-            # Write model
-            joblib.dump(weekly_ha, os.path.join(MODEL_CACHE_PATH, model_file_name))
+        # Fitting, e.g. the grid search of SVR, runs in a worker process
+        await self.node.async_add_job(fit_link_model, model_name, train_index, train_values,
+            os.path.join(MODEL_CACHE_PATH, model_file_name))
 
         metadata = {
             'hash': model_hash_hex,
             'model': model_name,
             'linkRef': link_ref,
             'time': time.isoformat(),
-            'trained': datetime.now().isoformat(),
+            'trained': dt_util.now().replace(tzinfo=None).isoformat(),
             'resourceUrl': os.path.join(MODEL_CACHE_PATH, model_file_name)
         }
 
@@ -149,8 +139,27 @@ class Trainer():
         with open(os.path.join(MODEL_CACHE_PATH, metadata_file_name), 'w') as f:
             json.dump(metadata, f)
         
-        self.node.events.publish('link_model_available', {
+        await self.node.events.async_publish('link_model_available', {
             'metadata': metadata
-        })
+        }, routing_key('link_model_available', link_ref))
 
         return metadata
+
+@cpu_bound
+def fit_link_model(model_name, train_index, train_values, model_path):
+    """Fit a link model and write it to `model_path`."""
+    from vehicletracker.models import WeeklySvr
+    from vehicletracker.models import WeeklyHistoricalAverage
+
+    import joblib
+
+    if model_name == 'svr':
+        model = WeeklySvr(verbose = False)
+    elif model_name == 'ha':
+        model = WeeklyHistoricalAverage()
+    else:
+        return
+
+    model.fit(train_index, train_values)
+    # Write model
+    joblib.dump(model, model_path)
@@ -13,9 +13,33 @@ ATTR_EVENT_TYPE = 'eventType'
 ATTR_NODE_NAME = 'node'
 ATTR_NOW = 'now'
 
+# Node configuration of domain queues and services
+ATTR_DOMAINS = 'domains'
+ATTR_SERVICES = 'services'
+ATTR_LANES = 'lanes'
+ATTR_LANE = 'lane'
+ATTR_EVENTS = 'events'
+ATTR_EXPIRATION = 'expiration'
+ATTR_MAX_AGE = 'max_age'
+ATTR_PREFETCH_COUNT = 'prefetch_count'
+ATTR_MAX_CONCURRENCY = 'max_concurrency'
+ATTR_CACHE = 'cache'
+ATTR_HEDGE = 'hedge'
+ATTR_DISCOVERY = 'discovery'
+ATTR_FAST_FAIL = 'fast_fail'
+ATTR_GRACE_PERIOD = 'grace_period'
+ATTR_EXECUTORS = 'executors'
+ATTR_CLOCK = 'clock'
+ATTR_WATCHDOG = 'watchdog'
+ATTR_TRACING = 'tracing'
+
 EVENT_NODE_START = 'node_start'
 EVENT_NODE_STOP = 'node_stop'
 EVENT_REPLY = 'reply'
+EVENT_REPLY_CHUNK = 'reply_chunk'
+EVENT_REPLY_CREDIT = 'reply_credit'
+EVENT_SERVICE_LOAD = 'service_load'
+EVENT_SERVICE_REQUEST = 'service_request'
 EVENT_TIME_CHANGED = 'time_changed'
 
 # How long to wait till things that run on startup have to finish.
@@ -6,3 +6,19 @@ class ModelNotFound(ApplicationError):
    """Raised when no model meeting the specification could be found."""
    def __init__(self, message):
       self.message = message
+
+class ServiceCallError(ApplicationError):
+   """Raised when a streaming service call fails or times out."""
+   def __init__(self, message):
+      super().__init__(message)
+      self.message = message
+
+class DeadlineExceeded(ApplicationError):
+   """Raised when a service request expires before it is handled."""
+   pass
+
+class ExecutorFull(ApplicationError):
+   """Raised when a job is rejected since the queue of its executor is full."""
+   def __init__(self, message):
+      super().__init__(message)
+      self.message = message
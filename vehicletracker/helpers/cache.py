@@ -0,0 +1,119 @@
+"""Caching of service results on the caller side."""
+import asyncio
+import collections
+import importlib
+import json
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from vehicletracker.helpers.json import json_default
+
+ATTR_TTL = 'ttl'
+ATTR_MAX_ENTRIES = 'max_entries'
+ATTR_KEY = 'key'
+
+DEFAULT_MAX_ENTRIES = 1024
+
+KEY_TYPE = Callable[[Dict[str, Any]], Hashable]
+
+def default_key(service_data : Dict[str, Any]) -> Hashable:
+    """Return a key of the service data, equal for equal service data."""
+    return json.dumps(service_data, sort_keys=True, default=json_default)
+
+class CachePolicy:
+    """How to cache the results of a service.
+
+    Results are cached for `ttl` seconds, at most `max_entries` at a time. The
+    key function maps service data to the key of the result, e.g. to round a
+    time such that calls within the same minute share a result.
+    """
+
+    def __init__(self, ttl : float, max_entries : int = DEFAULT_MAX_ENTRIES, key : Optional[KEY_TYPE] = None) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key = key or default_key
+
+    @classmethod
+    def from_config(cls, config : Dict[str, Any]) -> 'CachePolicy':
+        """Create a policy from configuration, where the key is the path of a function."""
+        key = config.get(ATTR_KEY)
+        if key is not None:
+            module_name, function_name = key.rsplit(".", 1)
+            key = getattr(importlib.import_module(module_name), function_name)
+        return cls(config[ATTR_TTL], config.get(ATTR_MAX_ENTRIES, DEFAULT_MAX_ENTRIES), key)
+
+    def to_config(self) -> Optional[Dict[str, Any]]:
+        """Return the configuration of the policy, e.g. to advertise it to callers on other nodes.
+
+        Returns None if the key function cannot be imported by its path, e.g. a lambda.
+        """
+        config : Dict[str, Any] = {ATTR_TTL: self.ttl, ATTR_MAX_ENTRIES: self.max_entries}
+        if self.key is not default_key:
+            path = f'{self.key.__module__}.{self.key.__qualname__}'
+            if '<' in path:
+                return None
+            config[ATTR_KEY] = path
+        return config
+
+class ResultCache:
+    """A LRU cache of service results which coalesces concurrent identical calls.
+
+    Cached results are shared between callers, and must therefore be treated
+    as read-only.
+    """
+
+    def __init__(self, policy : CachePolicy) -> None:
+        self.policy = policy
+        self._entries : 'collections.OrderedDict[Hashable, Tuple[float, Any]]' = collections.OrderedDict()
+        self._in_flight : Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Return the hit, miss and coalesced counts of the cache."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'entries': len(self._entries),
+        }
+
+    async def async_get(self, service_data : Dict[str, Any], call : Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached result for the service data, else the result of `call`."""
+        key = self.policy.key(service_data)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires, result = entry
+            if expires > monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            del self._entries[key]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            future = self._in_flight[key] = asyncio.ensure_future(call())
+            future.add_done_callback(lambda future: self._call_done(key, future))
+
+        # Do not cancel the call on behalf of the other callers
+        return await asyncio.shield(future)
+
+    def _call_done(self, key : Hashable, future : asyncio.Future) -> None:
+        """Cache the result of a call, unless it failed."""
+        del self._in_flight[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        if isinstance(result, dict) and 'error' in result:
+            return
+
+        self._entries[key] = (monotonic() + self.policy.ttl, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.policy.max_entries:
+            self._entries.popitem(last=False)
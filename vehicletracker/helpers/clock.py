@@ -0,0 +1,106 @@
+"""Clocks telling the time of operations, real or simulated."""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from vehicletracker.helpers import datetime as dt_util
+
+ATTR_START = 'start'
+ATTR_SPEED = 'speed'
+
+# The virtual clock only advances when told to, e.g. by a replay of events
+SPEED_STEP = 'step'
+
+# Key of the time an event happened at, in consumed events
+ATTR_EVENT_TIME = 'time'
+
+def event_time(event_data : Any) -> Optional[float]:
+    """Return the time (UNIX time) an event happened at, None if unknown.
+
+    The time is UNIX time or an ISO 8601 string, in the default time zone
+    unless given.
+    """
+    if not isinstance(event_data, dict):
+        return None
+    when = event_data.get(ATTR_EVENT_TIME)
+    if isinstance(when, bool):
+        return None
+    if isinstance(when, (int, float)):
+        return float(when)
+    if isinstance(when, str):
+        parsed = dt_util.parse_datetime(when)
+        if parsed is not None:
+            return dt_util.as_timestamp(dt_util.as_utc(parsed))
+    return None
+
+class Clock:
+    """The wall clock."""
+
+    # How many seconds pass on the clock per second of loop time, 0 if the
+    # clock only advances when told to
+    speed : float = 1.0
+
+    def time(self) -> float:
+        """Return the current time (UNIX time)."""
+        return time.time()
+
+    def loop_delay(self, seconds : float) -> Optional[float]:
+        """Return the loop time until `seconds` have passed on the clock, None if unknown."""
+        return seconds / self.speed if self.speed else None
+
+    def add_advance_listener(self, target : Callable[[], None]) -> Callable[[], None]:
+        """Call `target` when the clock is advanced, which the wall clock never is."""
+        return lambda: None
+
+class VirtualClock(Clock):
+    """A simulated clock, starting at `start` and running `speed` times faster than the wall clock.
+
+    With `speed` 'step', the clock stands still until advanced, which the
+    node does to the time of each consumed event. Either way, the clock may
+    be advanced, e.g. to the time of a replayed event.
+    This class must be used from within the event loop.
+    """
+
+    def __init__(self, loop : asyncio.AbstractEventLoop, start : Optional[float] = None, speed : Any = 1.0) -> None:
+        self._loop = loop
+        self.speed = 0.0 if speed == SPEED_STEP else float(speed)
+        self._start = time.time() if start is None else start
+        self._loop_start = loop.time()
+        self._advance_listeners : List[Callable[[], None]] = []
+
+    @classmethod
+    def from_config(cls, loop : asyncio.AbstractEventLoop, config : Dict[str, Any]) -> 'VirtualClock':
+        """Create a clock from configuration."""
+        start = config.get(ATTR_START)
+        if isinstance(start, str):
+            start = dt_util.parse_datetime(start)
+        if start is not None and not isinstance(start, (int, float)):
+            start = dt_util.as_timestamp(dt_util.as_utc(start))
+        return cls(loop, start, config.get(ATTR_SPEED, 1.0))
+
+    def time(self) -> float:
+        """Return the current time (UNIX time)."""
+        return self._start + (self._loop.time() - self._loop_start) * self.speed
+
+    def advance_to(self, when : float) -> None:
+        """Advance the clock to `when` (UNIX time), unless already past it."""
+        if when <= self.time():
+            return
+        self._start = when
+        self._loop_start = self._loop.time()
+        for target in list(self._advance_listeners):
+            target()
+
+    def advance(self, seconds : float) -> None:
+        """Advance the clock by `seconds`."""
+        self.advance_to(self.time() + seconds)
+
+    def add_advance_listener(self, target : Callable[[], None]) -> Callable[[], None]:
+        """Call `target` when the clock is advanced."""
+        self._advance_listeners.append(target)
+
+        def remove() -> None:
+            """Remove the listener."""
+            self._advance_listeners.remove(target)
+
+        return remove
@@ -0,0 +1,140 @@
+"""Codecs for encoding messages on the wire."""
+import logging
+import struct
+import sys
+from typing import Any, Dict, Optional
+
+from vehicletracker.helpers.json import DateTimeEncoder, json_default
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTENT_TYPE_JSON = 'application/json'
+CONTENT_TYPE_MSGPACK = 'application/msgpack'
+
+DEFAULT_CONTENT_TYPE = CONTENT_TYPE_JSON
+
+# MessagePack extension type of NumPy arrays
+ARRAY_EXT_TYPE = 1
+# Length prefix of the array header
+_ARRAY_HEADER_LENGTH = struct.Struct('<H')
+
+def pack_array(array) -> Optional[bytes]:
+    """Pack a NumPy array as a dtype/shape header followed by the raw buffer.
+
+    Returns None for arrays that have no raw representation, e.g. of objects.
+    """
+    if array.dtype.hasobject:
+        return None
+    import numpy as np
+    array = np.require(array, requirements='C')
+    header = (array.dtype.str + ':' + ','.join(str(x) for x in array.shape)).encode('ascii')
+    return _ARRAY_HEADER_LENGTH.pack(len(header)) + header + array.data
+
+def unpack_array(data : bytes):
+    """Unpack a NumPy array packed by `pack_array`.
+
+    The buffer is copied once, since an array over the message is read-only
+    and handlers may modify their input in place.
+    """
+    import numpy as np
+    header_length, = _ARRAY_HEADER_LENGTH.unpack_from(data)
+    offset = _ARRAY_HEADER_LENGTH.size + header_length
+    dtype, shape = bytes(data[_ARRAY_HEADER_LENGTH.size:offset]).decode('ascii').split(':')
+    shape = tuple(int(x) for x in shape.split(',') if x)
+    return np.frombuffer(data, dtype=dtype, offset=offset).reshape(shape).copy()
+
+class Codec:
+    """Base class for message codecs."""
+
+    content_type: str
+
+    def encode(self, obj : Any) -> bytes:
+        """Encode an object into bytes."""
+        raise NotImplementedError
+
+    def decode(self, data : bytes) -> Any:
+        """Decode bytes into an object."""
+        raise NotImplementedError
+
+class JsonCodec(Codec):
+    """JSON codec using orjson when available, otherwise the standard library.
+
+    This is the default codec. NumPy arrays are encoded as lists, and are
+    decoded as lists.
+    """
+
+    content_type = CONTENT_TYPE_JSON
+
+    def __init__(self) -> None:
+        """Initialize the codec."""
+        try:
+            import orjson
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            self._dumps = lambda obj: orjson.dumps(obj, default=json_default, option=option)
+            self._loads = orjson.loads
+        except ImportError:
+            import json
+            encoder = DateTimeEncoder()
+            self._dumps = lambda obj: encoder.encode(obj).encode('utf-8')
+            self._loads = json.loads
+
+    def encode(self, obj : Any) -> bytes:
+        """Encode an object as JSON."""
+        return self._dumps(obj)
+
+    def decode(self, data : bytes) -> Any:
+        """Decode JSON."""
+        return self._loads(data)
+
+class MsgpackCodec(Codec):
+    """Compact binary codec using MessagePack.
+
+    NumPy arrays are carried as an extension type holding a dtype/shape header
+    and the raw buffer, and are decoded into writable NumPy arrays again.
+    Only this codec does so; the default JSON codec turns arrays into lists.
+    """
+
+    content_type = CONTENT_TYPE_MSGPACK
+
+    def __init__(self) -> None:
+        """Initialize the codec."""
+        import msgpack
+        self._msgpack = msgpack
+
+    def encode(self, obj : Any) -> bytes:
+        """Encode an object as MessagePack."""
+        return self._msgpack.packb(obj, default=self._default, use_bin_type=True)
+
+    def decode(self, data : bytes) -> Any:
+        """Decode MessagePack."""
+        return self._msgpack.unpackb(data, raw=False, strict_map_key=False, ext_hook=self._ext_hook)
+
+    def _default(self, obj : Any) -> Any:
+        numpy = sys.modules.get('numpy')
+        if numpy is not None and isinstance(obj, numpy.ndarray):
+            packed = pack_array(obj)
+            if packed is not None:
+                return self._msgpack.ExtType(ARRAY_EXT_TYPE, packed)
+        return json_default(obj)
+
+    def _ext_hook(self, code : int, data : bytes) -> Any:
+        if code == ARRAY_EXT_TYPE:
+            return unpack_array(data)
+        return self._msgpack.ExtType(code, data)
+
+CODEC_CLASSES = {
+    CONTENT_TYPE_JSON: JsonCodec,
+    CONTENT_TYPE_MSGPACK: MsgpackCodec,
+}
+
+_CODECS : Dict[str, Codec] = {}
+
+def get_codec(content_type : str = None) -> Codec:
+    """Get the codec for a content type, defaulting to JSON."""
+    content_type = content_type or DEFAULT_CONTENT_TYPE
+    codec = _CODECS.get(content_type)
+    if codec is None:
+        if content_type not in CODEC_CLASSES:
+            raise ValueError(f"Unsupported content type '{content_type}'")
+        codec = _CODECS[content_type] = CODEC_CLASSES[content_type]()
+    return codec
@@ -1,7 +1,8 @@
 """Helper methods to handle the time in Vehicle Tracker."""
 import datetime as dt
 import re
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
 import pytz
 import pytz.exceptions as pytzexceptions
@@ -12,6 +13,8 @@ from vehicletracker.const import MATCH_ALL
 DATE_STR_FORMAT = "%Y-%m-%d"
 UTC = pytz.utc
 DEFAULT_TIME_ZONE: dt.tzinfo = pytz.timezone('Europe/Copenhagen')
+# Source of the current UNIX time, e.g. the clock of the node
+TIME_SOURCE: Callable[[], float] = time.time
 
 # Copyright (c) Django Software Foundation and individual contributors.
 # All rights reserved.
@@ -36,6 +39,15 @@ def set_default_time_zone(time_zone: dt.tzinfo) -> None:
     DEFAULT_TIME_ZONE = time_zone
 
 
+def set_time_source(time_source: Callable[[], float]) -> None:
+    """Set the source of the current UNIX time, e.g. to simulate time.
+    Async friendly.
+    """
+    global TIME_SOURCE
+
+    TIME_SOURCE = time_source
+
+
 def get_time_zone(time_zone_str: str) -> Optional[dt.tzinfo]:
     """Get time zone from string. Return None if unable to determine.
     Async friendly.
@@ -48,12 +60,12 @@ def get_time_zone(time_zone_str: str) -> Optional[dt.tzinfo]:
 
 def utcnow() -> dt.datetime:
     """Get now in UTC time."""
-    return dt.datetime.now(UTC)
+    return dt.datetime.fromtimestamp(TIME_SOURCE(), UTC)
 
 
 def now(time_zone: Optional[dt.tzinfo] = None) -> dt.datetime:
     """Get now in specified time zone."""
-    return dt.datetime.now(time_zone or DEFAULT_TIME_ZONE)
+    return dt.datetime.fromtimestamp(TIME_SOURCE(), time_zone or DEFAULT_TIME_ZONE)
 
 
 def as_utc(dattim: dt.datetime) -> dt.datetime:
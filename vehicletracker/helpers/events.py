@@ -7,8 +7,6 @@ from vehicletracker.core import CALLBACK_TYPE, VehicleTrackerNode, callback
 from vehicletracker.helpers import datetime as dt_util
 from vehicletracker.helpers.async_ import run_callback_threadsafe
 
-from vehicletracker.const import ATTR_NOW, EVENT_TIME_CHANGED
-
 def threaded_listener_factory(async_factory: Callable[..., Any]) -> CALLBACK_TYPE:
     """Convert an async event helper to a threaded one."""
 
@@ -33,7 +31,53 @@ def threaded_listener_factory(async_factory: Callable[..., Any]) -> CALLBACK_TYP
     return factory
 
 @callback
-async def async_track_utc_time_change(
+def async_track_point_in_utc_time(
+    node: VehicleTrackerNode,
+    action: Callable[..., None],
+    point_in_time: datetime,
+) -> CALLBACK_TYPE:
+    """Add a listener that fires once at the given point in UTC time."""
+    utc_point_in_time = dt_util.as_utc(point_in_time)
+    job = node.scheduler.call_at(dt_util.as_timestamp(utc_point_in_time), action, utc_point_in_time)
+
+    @callback
+    def remove() -> None:
+        """Remove the listener."""
+        node.scheduler.cancel(job)
+
+    return remove
+
+track_point_in_utc_time = threaded_listener_factory(async_track_point_in_utc_time)
+
+@callback
+def async_track_time_interval(
+    node: VehicleTrackerNode,
+    action: Callable[..., None],
+    interval: timedelta,
+) -> CALLBACK_TYPE:
+    """Add a listener that fires repetitively at every interval."""
+    remove = None
+
+    @callback
+    def interval_listener(now: datetime) -> None:
+        """Fire the action and schedule the next interval."""
+        nonlocal remove
+        remove = async_track_point_in_utc_time(node, interval_listener, now + interval)
+        node.async_run_job(action, now)
+
+    remove = async_track_point_in_utc_time(node, interval_listener, dt_util.utcnow() + interval)
+
+    @callback
+    def remove_listener() -> None:
+        """Remove the listener."""
+        remove()
+
+    return remove_listener
+
+track_time_interval = threaded_listener_factory(async_track_time_interval)
+
+@callback
+def async_track_utc_time_change(
     node: VehicleTrackerNode,
     action: Callable[..., None],
     hour: Optional[Any] = None,
@@ -42,47 +86,47 @@ async def async_track_utc_time_change(
     local: bool = False,
 ) -> CALLBACK_TYPE:
     """Add a listener that will fire if time matches a pattern."""
-    # We do not have to wrap the function with time pattern matching logic
-    # if no pattern given
     matching_seconds = dt_util.parse_time_expression(second, 0, 59)
     matching_minutes = dt_util.parse_time_expression(minute, 0, 59)
     matching_hours = dt_util.parse_time_expression(hour, 0, 23)
 
-    next_time = None
+    job = None
 
-    def calculate_next(now: datetime) -> None:
-        """Calculate and set the next time the trigger should fire."""
-        nonlocal next_time
+    @callback
+    def schedule_next(now: datetime) -> None:
+        """Schedule the listener at the next time matching the pattern."""
+        nonlocal job
 
         localized_now = dt_util.as_local(now) if local else now
         next_time = dt_util.find_next_time_expression_time(
             localized_now, matching_seconds, matching_minutes, matching_hours
         )
-
-    # Make sure rolling back the clock doesn't prevent the timer from
-    # triggering.
-    last_now: Optional[datetime] = None
+        job = node.scheduler.call_at(dt_util.as_timestamp(next_time), pattern_time_change_listener)
 
     @callback
-    def pattern_time_change_listener(_, event_data) -> None:
-        """Listen for matching time_changed events."""
-        nonlocal next_time, last_now
-
-        now = event_data[ATTR_NOW]
+    def pattern_time_change_listener() -> None:
+        """Fire the action and schedule the next matching time."""
+        now = dt_util.utcnow()
+        node.async_run_job(action, dt_util.as_local(now) if local else now)
+        schedule_next(now + timedelta(seconds=1))
 
-        if last_now is None or now < last_now:
-            # Time rolled back or next time not yet calculated
-            calculate_next(now)
+    # Make sure rolling back the clock doesn't prevent the timer from
+    # triggering, by finding the next matching time from the new time.
+    @callback
+    def clock_rolled_back() -> None:
+        """Reschedule the listener relative to the rolled back time."""
+        node.scheduler.cancel(job)
+        schedule_next(dt_util.utcnow())
 
-        last_now = now
+    remove_rollback_listener = node.scheduler.add_rollback_listener(clock_rolled_back)
+    schedule_next(dt_util.utcnow())
 
-        if next_time <= now:
-            node.async_run_job(action, dt_util.as_local(now) if local else now)
-            calculate_next(now + timedelta(seconds=1))
+    @callback
+    def remove() -> None:
+        """Remove the listener."""
+        remove_rollback_listener()
+        node.scheduler.cancel(job)
 
-    # We can't use async_track_point_in_utc_time here because it would
-    # break in the case that the system time abruptly jumps backwards.
-    # Our custom last_now logic takes care of resolving that scenario.
-    return await node.events.async_listen(EVENT_TIME_CHANGED, pattern_time_change_listener)
+    return remove
 
 track_utc_time_change = threaded_listener_factory(async_track_utc_time_change)
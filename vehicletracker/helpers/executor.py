@@ -0,0 +1,381 @@
+"""Bounded executors running the blocking jobs of components."""
+import asyncio
+import importlib
+import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import threading
+from time import monotonic
+from typing import (Any, Callable, Deque, Dict, Iterator, List, Optional,
+                    Tuple, Union)
+
+from vehicletracker.exceptions import ExecutorFull
+from vehicletracker.helpers.metrics import Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_MAX_WORKERS = 'max_workers'
+ATTR_MAX_QUEUE = 'max_queue'
+ATTR_POLICY = 'policy'
+ATTR_PRELOAD = 'preload'
+
+# Fail jobs with ExecutorFull once the queue is full
+POLICY_REJECT = 'reject'
+# Hold jobs back until there is room in the queue
+POLICY_DEFER = 'defer'
+
+DEFAULT_EXECUTOR = 'default'
+# Runs CPU-bound jobs in worker processes
+PROCESS_EXECUTOR = 'process'
+
+# Modules imported by worker processes before running any job
+DEFAULT_PRELOAD = ['numpy', 'pandas']
+
+COMPONENTS_PACKAGE = 'vehicletracker.components.'
+
+# The executor of the worker thread, if any
+_WORKER = threading.local()
+
+def current_executor() -> Optional['BoundedExecutor']:
+    """Return the executor running the current thread, None if not a worker thread."""
+    return getattr(_WORKER, 'executor', None)
+
+def component_of(target : Callable[..., Any]) -> Optional[str]:
+    """Return the name of the component defining `target`, if any."""
+    while isinstance(target, functools.partial):
+        target = target.func
+    module = getattr(target, '__module__', None) or ''
+    if not module.startswith(COMPONENTS_PACKAGE):
+        return None
+    return module[len(COMPONENTS_PACKAGE):].split('.', 1)[0]
+
+class _Job:
+    """A job waiting for a worker."""
+
+    __slots__ = ('future', 'context', 'target', 'args', 'enqueued')
+
+    def __init__(self, future : asyncio.Future, target : Callable[..., Any], args : Tuple[Any, ...]) -> None:
+        self.future = future
+        # Run in the current context, e.g. to know the deadline of a request
+        self.context = contextvars.copy_context()
+        self.target = target
+        self.args = args
+        self.enqueued = monotonic()
+
+class BoundedExecutor:
+    """Run jobs on at most `max_workers` threads, queueing at most `max_queue` jobs.
+
+    Queued jobs are started by priority, the higher the sooner, and in order
+    of submission within a priority. Once the queue is full, new jobs either
+    fail with ExecutorFull or wait for room in the queue, by the `policy`.
+    This class must be used from within the event `loop`, except for
+    submitting jobs, which may be done from any thread if the loop is given.
+    """
+
+    def __init__(self, name : str, max_workers : Optional[int] = None, max_queue : Optional[int] = None, policy : str = POLICY_REJECT, loop : Optional[asyncio.AbstractEventLoop] = None) -> None:
+        if policy not in (POLICY_REJECT, POLICY_DEFER):
+            raise ValueError("Unknown executor policy '%s'" % policy)
+        self.name = name
+        self._loop = loop
+        self.max_queue = max_queue
+        self.policy = policy
+        self._executor = self._create_executor(max_workers)
+        # pylint: disable=protected-access
+        self.max_workers : int = self._executor._max_workers
+        self._running = 0
+        self._queue : List[Tuple[int, int, _Job]] = []
+        self._deferred : Deque[Tuple[int, _Job]] = collections.deque()
+        self._seq = itertools.count()
+        self.max_queued = 0
+        self.rejected = 0
+        self.completed = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        # Seconds jobs waited for a worker
+        self.wait_times = Histogram()
+        # Workers blocked waiting for the event loop, e.g. for a reply
+        self._blocked_lock = threading.Lock()
+        self.blocked = 0
+        self.max_blocked = 0
+        self.blocked_total = 0
+
+    @classmethod
+    def from_config(cls, name : str, config : Dict[str, Any], loop : Optional[asyncio.AbstractEventLoop] = None) -> 'BoundedExecutor':
+        """Create an executor from configuration."""
+        return cls(name,
+            config.get(ATTR_MAX_WORKERS),
+            config.get(ATTR_MAX_QUEUE),
+            config.get(ATTR_POLICY, POLICY_REJECT),
+            loop)
+
+    def _create_executor(self, max_workers : Optional[int]) -> concurrent.futures.Executor:
+        return concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix=self.name)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue depth and wait times of the executor."""
+        return {
+            'workers': self.max_workers,
+            'running': self._running,
+            'queued': len(self._queue),
+            'deferred': len(self._deferred),
+            'max_queued': self.max_queued,
+            'rejected': self.rejected,
+            'completed': self.completed,
+            'wait_count': self.wait_count,
+            'wait_total': self.wait_total,
+            'wait_max': self.wait_max,
+            'blocked': self.blocked,
+            'max_blocked': self.max_blocked,
+            'blocked_total': self.blocked_total,
+        }
+
+    def submit(self, target : Callable[..., Any], *args : Any, priority : int = 0) -> 'Union[asyncio.Future, concurrent.futures.Future]':
+        """Submit a job, returning a future of its result.
+
+        Jobs submitted from another thread, e.g. by a worker, are handed over
+        to the event loop, returning a concurrent future of the result.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or (self._loop is not None and loop is not self._loop):
+            if self._loop is None:
+                raise RuntimeError("Executor '%s' does not know its event loop to submit to" % self.name)
+            return asyncio.run_coroutine_threadsafe(self._async_submit(target, *args, priority=priority), self._loop)
+
+        future = loop.create_future()
+        job = _Job(future, target, args)
+        if self._running < self.max_workers and not self._queue:
+            self._start(job)
+        elif self.max_queue is None or len(self._queue) < self.max_queue:
+            self._enqueue(priority, job)
+        elif self.policy == POLICY_DEFER:
+            self._deferred.append((priority, job))
+        else:
+            self.rejected += 1
+            _LOGGER.warning("Rejecting job %s since the queue of executor '%s' is full", target, self.name)
+            future.set_exception(ExecutorFull(
+                "Queue of executor '%s' is full (%s jobs)" % (self.name, self.max_queue)))
+        return future
+
+    async def _async_submit(self, target : Callable[..., Any], *args : Any, priority : int = 0) -> Any:
+        return await self.submit(target, *args, priority=priority)
+
+    def _enqueue(self, priority : int, job : _Job) -> None:
+        heapq.heappush(self._queue, (-priority, next(self._seq), job))
+        self.max_queued = max(self.max_queued, len(self._queue))
+
+    def _start(self, job : _Job) -> None:
+        wait = monotonic() - job.enqueued
+        self.wait_count += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.wait_times.observe(wait)
+
+        self._running += 1
+        inner = self._run(job)
+        inner.add_done_callback(functools.partial(self._job_done, job.future))
+
+    def _run(self, job : _Job) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, self._run_in_worker, job)
+
+    def _run_in_worker(self, job : _Job) -> Any:
+        _WORKER.executor = self
+        try:
+            return job.context.run(job.target, *job.args)
+        finally:
+            _WORKER.executor = None
+
+    @contextlib.contextmanager
+    def blocking(self, reason : str) -> Iterator[None]:
+        """Report that the current worker is blocked waiting for the event loop.
+
+        Workers blocked like this do not make progress, and once all workers
+        are blocked, jobs they wait for may never start.
+        """
+        with self._blocked_lock:
+            self.blocked += 1
+            self.blocked_total += 1
+            self.max_blocked = max(self.max_blocked, self.blocked)
+            blocked = self.blocked
+        if blocked >= self.max_workers:
+            _LOGGER.warning("All %s workers of executor '%s' are blocked, the last waiting for %s",
+                self.max_workers, self.name, reason)
+        else:
+            _LOGGER.debug("Worker of executor '%s' is blocked waiting for %s", self.name, reason)
+        try:
+            yield
+        finally:
+            with self._blocked_lock:
+                self.blocked -= 1
+
+    def _job_done(self, future : asyncio.Future, inner : asyncio.Future) -> None:
+        self._running -= 1
+        self.completed += 1
+        if not future.cancelled():
+            if inner.cancelled():
+                future.cancel()
+            elif inner.exception() is not None:
+                future.set_exception(inner.exception())
+            else:
+                future.set_result(inner.result())
+        self._drain()
+
+    def _drain(self) -> None:
+        """Start queued jobs while there are idle workers, and admit deferred jobs."""
+        while True:
+            if self._queue and self._running < self.max_workers:
+                _, _, job = heapq.heappop(self._queue)
+                if not job.future.cancelled():
+                    self._start(job)
+            elif self._deferred and (self.max_queue is None or len(self._queue) < self.max_queue):
+                priority, job = self._deferred.popleft()
+                if not job.future.cancelled():
+                    self._enqueue(priority, job)
+            else:
+                break
+
+    def _cancel_queued(self) -> None:
+        """Cancel the jobs not yet started."""
+        for _, _, job in self._queue:
+            job.future.cancel()
+        for _, job in self._deferred:
+            job.future.cancel()
+        self._queue.clear()
+        self._deferred.clear()
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and wait for running jobs to complete.
+
+        This method must be run in the event loop, which it blocks.
+        """
+        self._cancel_queued()
+        self._executor.shutdown(wait=True)
+
+    async def async_shutdown(self) -> None:
+        """Cancel queued jobs and wait for running jobs to complete, without blocking the event loop.
+
+        This method must be run in the event loop.
+        """
+        self._cancel_queued()
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(self._executor.shutdown, wait=True))
+
+def _preload(modules : List[str]) -> None:
+    """Import modules in a worker process, so that its first job does not pay for it."""
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            _LOGGER.warning("Unable to preload module '%s' in worker process", module)
+
+def _ready() -> bool:
+    return True
+
+class ProcessExecutor(BoundedExecutor):
+    """Run CPU-bound jobs in at most `max_workers` processes, queueing at most `max_queue` jobs.
+
+    Jobs and their arguments and results are pickled, so targets must be
+    defined at module level. Jobs do not run in the context of the caller,
+    e.g. the deadline of a request is unknown to them. Each worker process
+    imports the `preload` modules on start.
+    """
+
+    def __init__(self, name : str, max_workers : Optional[int] = None, max_queue : Optional[int] = None, policy : str = POLICY_REJECT, preload : Optional[List[str]] = None, loop : Optional[asyncio.AbstractEventLoop] = None) -> None:
+        self.preload = DEFAULT_PRELOAD if preload is None else preload
+        super().__init__(name, max_workers, max_queue, policy, loop)
+
+    @classmethod
+    def from_config(cls, name : str, config : Dict[str, Any], loop : Optional[asyncio.AbstractEventLoop] = None) -> 'ProcessExecutor':
+        """Create an executor from configuration."""
+        return cls(name,
+            config.get(ATTR_MAX_WORKERS),
+            config.get(ATTR_MAX_QUEUE),
+            config.get(ATTR_POLICY, POLICY_REJECT),
+            config.get(ATTR_PRELOAD),
+            loop)
+
+    def _create_executor(self, max_workers : Optional[int]) -> concurrent.futures.Executor:
+        return concurrent.futures.ProcessPoolExecutor(max_workers, initializer=_preload, initargs=(self.preload,))
+
+    def _run(self, job : _Job) -> asyncio.Future:
+        return asyncio.get_running_loop().run_in_executor(self._executor, job.target, *job.args)
+
+    async def async_warm_up(self) -> None:
+        """Start all worker processes and wait for them to preload."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _ready) for _ in range(self.max_workers)))
+
+class Executors:
+    """The executors of a node by name.
+
+    Jobs of a component run on the executor named after the component if
+    configured, else on the default executor. CPU-bound jobs run on the
+    process executor, which is started on first use unless configured.
+    """
+
+    def __init__(self, config : Optional[Dict[str, Any]] = None, loop : Optional[asyncio.AbstractEventLoop] = None) -> None:
+        config = dict(config or {})
+        self._loop = loop
+        default_config = config.pop(DEFAULT_EXECUTOR, None) or {}
+        self.default = BoundedExecutor.from_config(DEFAULT_EXECUTOR, default_config, loop)
+        self._process_config = config.pop(PROCESS_EXECUTOR, None)
+        self._process : Optional[ProcessExecutor] = None
+        self._executors : Dict[str, BoundedExecutor] = {
+            name: BoundedExecutor.from_config(name, executor_config or {}, loop)
+            for name, executor_config in config.items()
+        }
+
+    def get(self, name : Optional[str]) -> BoundedExecutor:
+        """Return the executor by name, or the default executor if unknown."""
+        return self._executors.get(name, self.default) if name else self.default
+
+    def executor_for(self, target : Callable[..., Any]) -> BoundedExecutor:
+        """Return the executor running jobs of the component defining `target`."""
+        return self.get(component_of(target))
+
+    @property
+    def process(self) -> ProcessExecutor:
+        """Return the executor running CPU-bound jobs."""
+        if self._process is None:
+            self._process = ProcessExecutor.from_config(PROCESS_EXECUTOR, self._process_config or {}, self._loop)
+        return self._process
+
+    async def async_warm_up(self) -> None:
+        """Start the worker processes of the process executor, if configured."""
+        if self._process_config is not None:
+            await self.process.async_warm_up()
+
+    def __iter__(self) -> Iterator[BoundedExecutor]:
+        """Iterate the executors started so far."""
+        yield self.default
+        yield from self._executors.values()
+        if self._process is not None:
+            yield self._process
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the queue depth and wait times by executor."""
+        stats = {DEFAULT_EXECUTOR: self.default.stats}
+        stats.update((name, executor.stats) for name, executor in self._executors.items())
+        if self._process is not None:
+            stats[PROCESS_EXECUTOR] = self._process.stats
+        return stats
+
+    async def async_shutdown(self) -> None:
+        """Shut down all executors, waiting for running jobs to complete."""
+        executors : List[BoundedExecutor] = [self.default, *self._executors.values()]
+        if self._process is not None:
+            executors.append(self._process)
+        for executor in executors:
+            await executor.async_shutdown()
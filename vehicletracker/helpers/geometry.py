@@ -1,18 +1,26 @@
+import functools
+
 import numpy as np
 import pandas as pd
-import geopandas as gpd
-
-import pyproj
 
 import shapely
 import shapely.wkt
 from shapely.geometry import Point, Polygon, MultiLineString
 from shapely.ops import transform
 
-wgs84 = pyproj.Proj("+init=EPSG:4326")
-etrs89_utm32 = pyproj.Proj("+init=EPSG:25832")
-project = lambda x, y: pyproj.transform(wgs84, etrs89_utm32, x, y)
-inverse = lambda x, y: pyproj.transform(etrs89_utm32, wgs84, x, y)
+@functools.lru_cache(maxsize=None)
+def _projections():
+    """Create the projections on first use, as loading pyproj and its database is slow."""
+    import pyproj
+    return pyproj, pyproj.Proj("+init=EPSG:4326"), pyproj.Proj("+init=EPSG:25832")
+
+def project(x, y):
+    pyproj, wgs84, etrs89_utm32 = _projections()
+    return pyproj.transform(wgs84, etrs89_utm32, x, y)
+
+def inverse(x, y):
+    pyproj, wgs84, etrs89_utm32 = _projections()
+    return pyproj.transform(etrs89_utm32, wgs84, x, y)
 
 def to_utm32(geom_wgs84):
     return transform(project, geom_wgs84)
@@ -0,0 +1,58 @@
+"""Hedging of service calls against slow replicas."""
+import collections
+import math
+from typing import Any, Dict, Optional
+
+ATTR_DELAY = 'delay'
+ATTR_PERCENTILE = 'percentile'
+ATTR_MIN_SAMPLES = 'min_samples'
+
+DEFAULT_DELAY = 1.0
+DEFAULT_MIN_SAMPLES = 20
+# Number of recent latencies to derive the hedge delay from
+LATENCY_WINDOW = 200
+
+class LatencyWindow:
+    """The most recent latencies of calls to a service."""
+
+    def __init__(self, size : int = LATENCY_WINDOW) -> None:
+        self._latencies : 'collections.deque[float]' = collections.deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def add(self, latency : float) -> None:
+        """Add the latency of a call."""
+        self._latencies.append(latency)
+
+    def percentile(self, percentile : float) -> float:
+        """Return the latency below which `percentile` percent of the calls completed."""
+        latencies = sorted(self._latencies)
+        index = math.ceil(percentile / 100 * len(latencies)) - 1
+        return latencies[min(max(index, 0), len(latencies) - 1)]
+
+class HedgePolicy:
+    """When to hedge a call, i.e. to send a duplicate request to another replica.
+
+    The call is hedged at the `percentile` of recent latencies once at least
+    `min_samples` are known, otherwise after `delay` seconds.
+    """
+
+    def __init__(self, delay : float = DEFAULT_DELAY, percentile : Optional[float] = None, min_samples : int = DEFAULT_MIN_SAMPLES) -> None:
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+
+    @classmethod
+    def from_config(cls, config : Dict[str, Any]) -> 'HedgePolicy':
+        """Create a policy from configuration."""
+        return cls(
+            config.get(ATTR_DELAY, DEFAULT_DELAY),
+            config.get(ATTR_PERCENTILE),
+            config.get(ATTR_MIN_SAMPLES, DEFAULT_MIN_SAMPLES))
+
+    def hedge_delay(self, latencies : LatencyWindow) -> float:
+        """Return how long to wait for a reply before hedging."""
+        if self.percentile is not None and len(latencies) >= self.min_samples:
+            return latencies.percentile(self.percentile)
+        return self.delay
@@ -3,7 +3,7 @@ import threading
 import queue
 import multiprocessing
 
-from datetime import datetime
+from vehicletracker.helpers import datetime as dt_util
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,13 +30,13 @@ class LocalJobRunner(object):
             _LOGGER.info(f"Starting background job '{job_id}'.")
             try:
                 job['status'] = 'running'
-                job['started'] = datetime.now().isoformat()
+                job['started'] = dt_util.now().replace(tzinfo=None).isoformat()
                 job['result'] = target(job['data'])
                 job['status'] = 'completed'
-                job['stopped'] = datetime.now().isoformat()
+                job['stopped'] = dt_util.now().replace(tzinfo=None).isoformat()
             except Exception as e:
                 job['status'] = 'failed'
-                job['stopped'] = datetime.now().isoformat()
+                job['stopped'] = dt_util.now().replace(tzinfo=None).isoformat()
                 job['error'] = str(e)
                 _LOGGER.exception('error in worker loop')
             
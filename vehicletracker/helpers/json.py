@@ -1,15 +1,31 @@
 import json
 import datetime
 import decimal
+import sys
+
+def json_default(obj):
+    """Convert objects not natively serializable to JSON compatible types."""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    elif isinstance(obj, datetime.timedelta):
+        return (datetime.datetime.min + obj).time().isoformat()
+    elif isinstance(obj, decimal.Decimal):
+        return float(obj)
+
+    # Only look for NumPy types if NumPy has been loaded by someone else.
+    numpy = sys.modules.get('numpy')
+    if numpy is not None:
+        if isinstance(obj, numpy.generic):
+            return obj.item()
+        elif isinstance(obj, numpy.ndarray):
+            return obj.tolist()
+
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
 
 class DateTimeEncoder(json.JSONEncoder):
 
     def default(self, obj):
-        if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
-            return obj.isoformat()
-        elif isinstance(obj, datetime.timedelta):
-            return (datetime.datetime.min + obj).time().isoformat()
-        elif isinstance(obj, decimal.Decimal):
-            return float(obj)
-
-        return super(DateTimeEncoder, self).default(obj)
\ No newline at end of file
+        try:
+            return json_default(obj)
+        except TypeError:
+            return super(DateTimeEncoder, self).default(obj)
@@ -0,0 +1,186 @@
+"""Metrics of a node, i.e. counters, gauges and latency histograms.
+
+Metrics are exported as a dictionary, e.g. by the 'metrics' service, or in
+the Prometheus text format, e.g. on '/api/metrics'.
+"""
+import bisect
+import math
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Prefix of the names of exported metrics
+PREFIX = 'vehicletracker_'
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4'
+
+# Upper bounds of latency buckets (seconds)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of payload size buckets (bytes)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(labels : Optional[Dict[str, Any]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+def _format_labels(labels : Labels) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+def _format_value(value : float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+class Histogram:
+    """Counts of observed values by bucket, i.e. by upper bound."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets : Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        # The last count is of values above all buckets
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value : float) -> None:
+        """Count a value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, quantile : float) -> float:
+        """Return an upper bound of the value below which `quantile` of the values are, 0 if none."""
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Return the cumulative counts by upper bound, ending with +Inf."""
+        result = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            cumulative += count
+            result.append((bound, cumulative))
+        return result
+
+class Metrics:
+    """Counters, gauges and histograms by name and labels.
+
+    Gauges which are cheaper to read than to keep up to date are set by
+    collectors, which are called whenever the metrics are exported.
+    This class must be used from within the event loop.
+    """
+
+    def __init__(self) -> None:
+        # Map from name to type and help text
+        self._descriptions : Dict[str, Tuple[str, str]] = {}
+        self._values : Dict[str, Dict[Labels, Any]] = {}
+        self._collectors : List[Callable[['Metrics'], None]] = []
+
+    def _series(self, name : str, kind : str) -> Dict[Labels, Any]:
+        series = self._values.get(name)
+        if series is None:
+            series = self._values[name] = {}
+            self._descriptions.setdefault(name, (kind, ''))
+        return series
+
+    def describe(self, name : str, kind : str, description : str) -> None:
+        """Set the type and help text of a metric."""
+        self._descriptions[name] = (kind, description)
+
+    def inc(self, name : str, labels : Optional[Dict[str, Any]] = None, value : float = 1) -> None:
+        """Increment a counter, or a gauge if described as such."""
+        series = self._series(name, COUNTER)
+        key = _labels(labels)
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name : str, value : float, labels : Optional[Dict[str, Any]] = None) -> None:
+        """Set a gauge."""
+        self._series(name, GAUGE)[_labels(labels)] = value
+
+    def histogram(self, name : str, labels : Optional[Dict[str, Any]] = None, buckets : Iterable[float] = LATENCY_BUCKETS) -> Histogram:
+        """Return a histogram, created with `buckets` unless it exists."""
+        series = self._series(name, HISTOGRAM)
+        key = _labels(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, name : str, value : float, labels : Optional[Dict[str, Any]] = None, buckets : Iterable[float] = LATENCY_BUCKETS) -> None:
+        """Count a value in a histogram."""
+        self.histogram(name, labels, buckets).observe(value)
+
+    def add_histogram(self, name : str, histogram : Histogram, labels : Optional[Dict[str, Any]] = None) -> None:
+        """Export a histogram kept elsewhere, e.g. by an executor."""
+        self._series(name, HISTOGRAM)[_labels(labels)] = histogram
+
+    def add_collector(self, collector : Callable[['Metrics'], None]) -> None:
+        """Call `collector` with the metrics whenever they are exported."""
+        self._collectors.append(collector)
+
+    def collect(self) -> None:
+        """Update the metrics set by collectors."""
+        for collector in self._collectors:
+            collector(self)
+
+    def get(self, name : str, labels : Optional[Dict[str, Any]] = None) -> Any:
+        """Return the value or histogram of a metric, None if unknown."""
+        return self._values.get(name, {}).get(_labels(labels))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics by name, as lists of samples."""
+        self.collect()
+        result : Dict[str, Any] = {}
+        for name, series in self._values.items():
+            kind, _ = self._descriptions[name]
+            samples = []
+            for labels, value in series.items():
+                sample : Dict[str, Any] = {'labels': dict(labels)}
+                if isinstance(value, Histogram):
+                    sample.update({
+                        'count': value.count,
+                        'sum': value.sum,
+                        'buckets': [[bound if math.isfinite(bound) else '+Inf', count] for bound, count in value.cumulative()],
+                    })
+                else:
+                    sample['value'] = value
+                samples.append(sample)
+            result[name] = {'type': kind, 'samples': samples}
+        return result
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format."""
+        self.collect()
+        lines = []
+        for name in sorted(self._values):
+            kind, description = self._descriptions[name]
+            full_name = PREFIX + name
+            if description:
+                lines.append(f'# HELP {full_name} {description}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for labels, value in sorted(self._values[name].items()):
+                if not isinstance(value, Histogram):
+                    lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                for bound, count in value.cumulative():
+                    bucket_labels = labels + (('le', _format_value(bound)),)
+                    lines.append(f'{full_name}_bucket{_format_labels(bucket_labels)} {count}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(value.sum)}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {value.count}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,147 @@
+"""Scheduling of jobs at points in time."""
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+
+from vehicletracker.helpers.clock import Clock
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long to sleep at most, i.e. how soon a change of the wall clock is noticed
+MAX_SLEEP = 60
+# How far the wall clock may fall behind the loop clock before it is
+# considered rolled back
+ROLLBACK_TOLERANCE = 1
+
+class ScheduledJob:
+    """A job scheduled at a point in time."""
+
+    __slots__ = ('when', 'target', 'args', 'cancelled')
+
+    def __init__(self, when : float, target : Callable[..., Any], args : Tuple[Any, ...]) -> None:
+        self.when = when
+        self.target = target
+        self.args = args
+        self.cancelled = False
+
+class Scheduler:
+    """Run jobs at points in time of a clock, by default the wall clock.
+
+    Jobs are kept in a heap, and the event loop is woken only when the
+    earliest job is due, or after at most MAX_SLEEP seconds to notice changes
+    of the wall clock. Listeners are told when the wall clock rolls back. A
+    clock which only advances when told to wakes the scheduler as it does.
+    This class must be used from within the event loop.
+    """
+
+    def __init__(self, loop : asyncio.AbstractEventLoop, run_job : Callable[..., Any], clock : Optional[Clock] = None) -> None:
+        self._loop = loop
+        self._run_job = run_job
+        self._clock = clock or Clock()
+        self._clock.add_advance_listener(self._schedule_wakeup)
+        self._heap : List[Tuple[float, int, ScheduledJob]] = []
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._handle : Optional[asyncio.TimerHandle] = None
+        self._wake_at : Optional[float] = None
+        # Wall clock and loop time of the last wakeup
+        self._last_now : Optional[float] = None
+        self._last_loop_time = 0.0
+        self._rollback_listeners : List[Callable[[], None]] = []
+        self.wakeups = 0
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def time(self) -> float:
+        """Return the current time of the clock (UNIX time)."""
+        return self._clock.time()
+
+    def call_at(self, when : float, target : Callable[..., Any], *args : Any) -> ScheduledJob:
+        """Run `target` at `when` (UNIX time), returning the job to cancel it."""
+        job = ScheduledJob(when, target, args)
+        heapq.heappush(self._heap, (when, next(self._seq), job))
+        if self._wake_at is None or self._heap[0][2] is job:
+            self._schedule_wakeup()
+        return job
+
+    def cancel(self, job : ScheduledJob) -> None:
+        """Cancel a job, unless it has already run."""
+        if job.cancelled:
+            return
+        job.cancelled = True
+        self._cancelled += 1
+        # Drop cancelled jobs once they make up most of the heap
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def add_rollback_listener(self, target : Callable[[], None]) -> Callable[[], None]:
+        """Call `target` when the wall clock is noticed to have rolled back."""
+        self._rollback_listeners.append(target)
+
+        def remove() -> None:
+            """Remove the listener."""
+            self._rollback_listeners.remove(target)
+
+        return remove
+
+    def _schedule_wakeup(self) -> None:
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+            self._wake_at = None
+        if not self._heap:
+            return
+
+        delay = self._clock.loop_delay(max(self._heap[0][0] - self.time(), 0))
+        if delay is None:
+            # Wait for the clock to be advanced
+            if self._heap[0][0] > self.time():
+                return
+            delay = 0
+        delay = min(delay, MAX_SLEEP)
+        self._wake_at = self._loop.time() + delay
+        self._handle = self._loop.call_at(self._wake_at, self._wake)
+
+    def _wake(self) -> None:
+        self._handle = None
+        self._wake_at = None
+        self.wakeups += 1
+
+        now = self.time()
+        loop_time = self._loop.time()
+        if self._last_now is not None:
+            expected = self._last_now + (loop_time - self._last_loop_time) * self._clock.speed
+            if now < expected - ROLLBACK_TOLERANCE:
+                _LOGGER.warning("Clock rolled back %.1f seconds.", expected - now)
+                for target in list(self._rollback_listeners):
+                    target()
+        self._last_now = now
+        self._last_loop_time = loop_time
+
+        while self._heap and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            if job.cancelled:
+                self._cancelled -= 1
+                continue
+            # Jobs may not be cancelled once they have run
+            job.cancelled = True
+            self._run_job(job.target, *job.args)
+
+        self._schedule_wakeup()
+
+    def stop(self) -> None:
+        """Cancel all jobs."""
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = None
+        self._wake_at = None
+        self._heap.clear()
+        self._cancelled = 0
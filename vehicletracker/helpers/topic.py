@@ -0,0 +1,143 @@
+"""Helpers for AMQP style topic routing keys."""
+import functools
+from typing import Any, Dict, List, Tuple
+
+# Separator between the words of a routing key.
+WORD_SEPARATOR = '.'
+# Matches exactly one word.
+MATCH_ONE_WORD = '*'
+# Matches zero or more words.
+MATCH_ANY_WORDS = '#'
+
+# Stands in for a missing word of a routing key.
+MISSING_WORD = '_'
+
+def routing_key(*words : Any) -> str:
+    """Join words into a routing key.
+
+    Separators and wildcards inside a word are replaced, so that e.g. a
+    journey reference can never span or match several words.
+    """
+    return WORD_SEPARATOR.join(
+        MISSING_WORD if word is None else
+        str(word).replace(WORD_SEPARATOR, MISSING_WORD).replace(MATCH_ONE_WORD, MISSING_WORD).replace(MATCH_ANY_WORDS, MISSING_WORD)
+        for word in words)
+
+def _words_match(pattern : List[str], key : List[str]) -> bool:
+    """Match the words of a routing key against the words of a pattern."""
+    if not pattern:
+        return not key
+
+    head = pattern[0]
+    if head == MATCH_ANY_WORDS:
+        return any(_words_match(pattern[1:], key[i:]) for i in range(len(key) + 1))
+    if not key:
+        return False
+    if head in (MATCH_ONE_WORD, key[0]):
+        return _words_match(pattern[1:], key[1:])
+    return False
+
+@functools.lru_cache(maxsize=4096)
+def topic_matches(pattern : str, routing_key : str) -> bool:
+    """Return whether `routing_key` matches the topic `pattern`.
+
+    Follows the semantics of an AMQP topic exchange: '*' matches exactly one
+    word and '#' matches zero or more words.
+    """
+    return _words_match(pattern.split(WORD_SEPARATOR), routing_key.split(WORD_SEPARATOR))
+
+class _TrieNode:
+    """A node of the topic trie, i.e. one word of a pattern."""
+
+    __slots__ = ('children', 'targets')
+
+    def __init__(self) -> None:
+        self.children : Dict[str, '_TrieNode'] = {}
+        self.targets : List[Any] = []
+
+class TopicTrie:
+    """Index of targets by topic pattern.
+
+    Routing keys are matched like a topic exchange would, by walking a trie of
+    the pattern words. Matches are cached per routing key and the cache is
+    invalidated whenever a target is added or removed.
+    """
+
+    def __init__(self, cache_size : int = 4096) -> None:
+        """Initialize an empty trie."""
+        self._root = _TrieNode()
+        self._patterns : Dict[str, int] = {}
+        self._cache : Dict[str, Tuple[Any, ...]] = {}
+        self._cache_size = cache_size
+
+    def __bool__(self) -> bool:
+        return bool(self._patterns)
+
+    def __contains__(self, pattern : str) -> bool:
+        return pattern in self._patterns
+
+    def add(self, pattern : str, target : Any) -> None:
+        """Add a target for the topic pattern."""
+        node = self._root
+        for word in pattern.split(WORD_SEPARATOR):
+            node = node.children.setdefault(word, _TrieNode())
+        node.targets.append(target)
+        self._patterns[pattern] = self._patterns.get(pattern, 0) + 1
+        self._cache.clear()
+
+    def remove(self, pattern : str, target : Any) -> None:
+        """Remove a target for the topic pattern.
+
+        Raises ValueError if the target was not added for the pattern.
+        """
+        if pattern not in self._patterns:
+            raise ValueError(f"Unknown pattern '{pattern}'")
+
+        path = [self._root]
+        for word in pattern.split(WORD_SEPARATOR):
+            path.append(path[-1].children[word])
+        path[-1].targets.remove(target)
+
+        # Prune nodes that no longer lead to any target
+        words = pattern.split(WORD_SEPARATOR)
+        for i in range(len(words), 0, -1):
+            node = path[i]
+            if node.targets or node.children:
+                break
+            del path[i - 1].children[words[i - 1]]
+
+        self._patterns[pattern] -= 1
+        if not self._patterns[pattern]:
+            del self._patterns[pattern]
+        self._cache.clear()
+
+    def match(self, routing_key : str) -> Tuple[Any, ...]:
+        """Return the targets of all patterns matching the routing key."""
+        targets = self._cache.get(routing_key)
+        if targets is None:
+            nodes : Dict[int, _TrieNode] = {}
+            self._match(self._root, routing_key.split(WORD_SEPARATOR), 0, nodes)
+            targets = tuple(target for node in nodes.values() for target in node.targets)
+            if len(self._cache) >= self._cache_size:
+                self._cache.clear()
+            self._cache[routing_key] = targets
+        return targets
+
+    def _match(self, node : _TrieNode, words : List[str], i : int, nodes : Dict[int, _TrieNode]) -> None:
+        """Collect the nodes matching words[i:], each pattern is collected once."""
+        any_words = node.children.get(MATCH_ANY_WORDS)
+        if any_words is not None:
+            for j in range(i, len(words) + 1):
+                self._match(any_words, words, j, nodes)
+
+        if i == len(words):
+            if node.targets:
+                nodes[id(node)] = node
+            return
+
+        child = node.children.get(words[i])
+        if child is not None:
+            self._match(child, words, i + 1, nodes)
+        one_word = node.children.get(MATCH_ONE_WORD)
+        if one_word is not None:
+            self._match(one_word, words, i + 1, nodes)
@@ -0,0 +1,207 @@
+"""Tracing of service calls across nodes.
+
+A trace is the tree of spans of a call, e.g. monitor -> predictor -> model
+load. The context of the current span is carried along with service
+requests, so that spans of nested calls on other nodes join the trace.
+Whether a trace is recorded is decided once, when it starts.
+"""
+import collections
+import contextlib
+import contextvars
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_SAMPLE_RATE = 'sample_rate'
+ATTR_MAX_SPANS = 'max_spans'
+ATTR_PATH = 'path'
+
+# Share of the traces recorded
+DEFAULT_SAMPLE_RATE = 0.01
+# How many recent spans are kept for querying
+DEFAULT_MAX_SPANS = 10000
+
+# Tells the writer thread to stop
+_STOP = object()
+
+# Keys of the trace context carried in service requests
+TRACE_ID = 'traceId'
+SPAN_ID = 'spanId'
+SAMPLED = 'sampled'
+SENT = 'sent'
+
+class SpanContext:
+    """The identity of a span, and the tracer recording the trace, if sampled."""
+
+    __slots__ = ('tracer', 'trace_id', 'span_id', 'sampled')
+
+    def __init__(self, tracer : 'Tracer', trace_id : str, span_id : Optional[str], sampled : bool) -> None:
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the context to carry in a request."""
+        return {TRACE_ID: self.trace_id, SPAN_ID: self.span_id, SAMPLED: self.sampled, SENT: time.time()}
+
+# The span being run, if any
+_CURRENT : contextvars.ContextVar[Optional[SpanContext]] = contextvars.ContextVar('span', default=None)
+
+def current_span() -> Optional[SpanContext]:
+    """Return the context of the span being run, None if not within a trace."""
+    return _CURRENT.get()
+
+def set_current_span(context : Optional[SpanContext]) -> None:
+    """Run the rest of the current task or thread in the span of `context`."""
+    _CURRENT.set(context)
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+class Tracer:
+    """Record the spans of sampled traces in a ring buffer, and optionally a file.
+
+    Spans are appended to the file at `path` as JSON lines, in batches by a
+    writer thread, so that recording does not block. The tracer may be used
+    from any thread, and must be closed to write the remaining spans.
+    """
+
+    def __init__(self, node_name : str, sample_rate : float = DEFAULT_SAMPLE_RATE, max_spans : int = DEFAULT_MAX_SPANS, path : Optional[str] = None) -> None:
+        self.node_name = node_name
+        self.sample_rate = sample_rate
+        self.path = path
+        self._spans : Deque[Dict[str, Any]] = collections.deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+        # Spans to write, started on the first span
+        self._writes : 'queue.SimpleQueue[Any]' = queue.SimpleQueue()
+        self._writer : Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, node_name : str, config : Dict[str, Any]) -> 'Tracer':
+        """Create a tracer from configuration."""
+        return cls(node_name,
+            config.get(ATTR_SAMPLE_RATE, DEFAULT_SAMPLE_RATE),
+            config.get(ATTR_MAX_SPANS, DEFAULT_MAX_SPANS),
+            config.get(ATTR_PATH))
+
+    def context(self, parent : Optional[Dict[str, Any]] = None) -> SpanContext:
+        """Return the context to start spans in, joining the trace of a request's `parent` if given.
+
+        Without a parent, the current trace is joined, else a trace is started
+        and sampled at the sample rate.
+        """
+        if parent is not None:
+            return SpanContext(self, parent[TRACE_ID], parent.get(SPAN_ID), bool(parent.get(SAMPLED)))
+        current = _CURRENT.get()
+        if current is not None:
+            return current
+        return SpanContext(self, _new_id(), None, random.random() < self.sample_rate)
+
+    def child(self, parent : SpanContext) -> SpanContext:
+        """Return the context of a new span, child of `parent`."""
+        return SpanContext(self, parent.trace_id, _new_id(), parent.sampled)
+
+    def record(self, parent : SpanContext, name : str, start : float, end : float, span_id : Optional[str] = None, **attributes : Any) -> Optional[str]:
+        """Record a span of the trace of `parent`, unless not sampled, returning its id."""
+        if not parent.sampled:
+            return None
+        span = {
+            'traceId': parent.trace_id,
+            'spanId': span_id or _new_id(),
+            'parentId': parent.span_id,
+            'name': name,
+            'node': self.node_name,
+            'start': start,
+            'duration': max(0.0, end - start),
+            'attributes': attributes,
+        }
+        with self._lock:
+            self._spans.append(span)
+            if self.path:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_spans, args=(self.path,), name='TraceWriter', daemon=True)
+                    self._writer.start()
+                self._writes.put(span)
+        return span['spanId']
+
+    def _write_spans(self, path : str) -> None:
+        """Append the spans to write to the file at `path` in batches, run in the writer thread."""
+        try:
+            file = open(path, 'a')
+        except OSError as ex:
+            _LOGGER.warning("Failed to open '%s' to write spans to: %s", path, ex)
+            with self._lock:
+                self.path = None
+            return
+
+        with file:
+            stopping = False
+            while not stopping:
+                batch = [self._writes.get()]
+                while True:
+                    try:
+                        batch.append(self._writes.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in batch:
+                    stopping = True
+                    batch = [span for span in batch if span is not _STOP]
+                try:
+                    file.write(''.join(json.dumps(span, default=str) + '\n' for span in batch))
+                    file.flush()
+                except OSError as ex:
+                    _LOGGER.warning("Failed to write spans to '%s': %s", path, ex)
+
+    def close(self) -> None:
+        """Write the remaining spans and stop the writer thread, which blocks."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._writes.put(_STOP)
+            writer.join()
+
+    @contextlib.contextmanager
+    def span(self, name : str, parent : Optional[SpanContext] = None, **attributes : Any) -> Iterator[SpanContext]:
+        """Run the block as a span, child of `parent` or of the current span.
+
+        Spans started within the block, e.g. of nested calls, are its children.
+        """
+        parent = parent or self.context()
+        context = self.child(parent)
+        token = _CURRENT.set(context)
+        start = time.time()
+        try:
+            yield context
+        finally:
+            _CURRENT.reset(token)
+            self.record(parent, name, start, time.time(), context.span_id, **attributes)
+
+    def spans(self, trace_id : Optional[str] = None, name : Optional[str] = None, limit : Optional[int] = None) -> List[Dict[str, Any]]:
+        """Return the recent spans, optionally of a trace or by name, latest first."""
+        with self._lock:
+            spans = list(self._spans)
+        result = [
+            span for span in reversed(spans)
+            if (trace_id is None or span['traceId'] == trace_id) and (name is None or span['name'] == name)]
+        return result[:limit] if limit is not None else result
+
+@contextlib.contextmanager
+def span(name : str, **attributes : Any) -> Iterator[Optional[SpanContext]]:
+    """Run the block as a child span of the current span, if within a trace.
+
+    E.g. to trace the steps of a service handler, such as loading a model.
+    """
+    current = _CURRENT.get()
+    if current is None:
+        yield None
+        return
+    with current.tracer.span(name, current, **attributes) as context:
+        yield context
@@ -0,0 +1,142 @@
+"""Detection of event loop lag, e.g. from blocking calls in callbacks."""
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from time import monotonic
+from typing import Any, Deque, Dict, List, Optional
+
+from vehicletracker.helpers.metrics import COUNTER, GAUGE, HISTOGRAM, Metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_ENABLED = 'enabled'
+ATTR_INTERVAL = 'interval'
+ATTR_THRESHOLD = 'threshold'
+
+# How often the event loop is probed (seconds)
+DEFAULT_INTERVAL = 0.1
+# How long the event loop may be stalled before the offender is recorded
+DEFAULT_THRESHOLD = 0.25
+# How many recent stalls are kept
+MAX_STALLS = 50
+# Quantiles of the lag exported as gauges
+LAG_QUANTILES = (0.5, 0.9, 0.99)
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Frames of these modules are the machinery running the offender
+_LOOP_MODULES = ('asyncio', 'selectors', 'threading', 'concurrent')
+
+def _offender(stack : traceback.StackSummary) -> str:
+    """Return the innermost frame of the stack outside the event loop machinery."""
+    for frame in reversed(stack):
+        module = frame.filename.replace('\\', '/')
+        if not any(f'/{name}/' in module or module.endswith(f'/{name}.py') for name in _LOOP_MODULES):
+            return f"{frame.filename}:{frame.lineno} ({frame.name})"
+    return "unknown"
+
+class LoopWatchdog:
+    """Measure the lag of the event loop and record what stalls it.
+
+    A callback is scheduled every `interval` seconds, and the lag is how
+    late it runs. A watcher thread samples the stack of the event loop
+    thread once the loop has not run the callback for `threshold` seconds,
+    which is cheap enough to leave on in production.
+    The watchdog must be started and stopped from within the event loop.
+    """
+
+    def __init__(self, loop, metrics : Metrics, interval : float = DEFAULT_INTERVAL, threshold : float = DEFAULT_THRESHOLD) -> None:
+        self._loop = loop
+        self._metrics = metrics
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = metrics.histogram('loop_lag_seconds', buckets=LAG_BUCKETS)
+        metrics.describe('loop_lag_seconds', HISTOGRAM, "Seconds the event loop ran scheduled callbacks late.")
+        metrics.describe('loop_lag_quantile_seconds', GAUGE, "Quantiles of the lag of the event loop.")
+        metrics.describe('loop_stalls_total', COUNTER, "Times the event loop stalled beyond the threshold.")
+        metrics.add_collector(self._collect_metrics)
+        self.stalls : Deque[Dict[str, Any]] = collections.deque(maxlen=MAX_STALLS)
+        self._lock = threading.Lock()
+        # Set by the watcher thread, reported by the loop once it runs again
+        self._sample : Optional[Dict[str, Any]] = None
+        self._expected = monotonic()
+        self._sampled = None
+        self._thread_id : Optional[int] = None
+        self._handle = None
+        self._stopping = threading.Event()
+        self._thread : Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, loop, metrics : Metrics, config : Dict[str, Any]) -> 'LoopWatchdog':
+        """Create a watchdog from configuration."""
+        return cls(loop, metrics,
+            config.get(ATTR_INTERVAL, DEFAULT_INTERVAL),
+            config.get(ATTR_THRESHOLD, DEFAULT_THRESHOLD))
+
+    def start(self) -> None:
+        """Start probing the event loop and watching it."""
+        if self._thread is not None:
+            return
+        self._thread_id = threading.get_ident()
+        self._stopping.clear()
+        self._schedule(monotonic())
+        self._thread = threading.Thread(target=self._watch, name='LoopWatchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop probing and watching the event loop."""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        self._stopping.set()
+        self._thread = None
+
+    def _schedule(self, now : float) -> None:
+        self._expected = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._probe)
+
+    def _probe(self) -> None:
+        now = monotonic()
+        lag = max(0.0, now - self._expected)
+        self.lag.observe(lag)
+
+        with self._lock:
+            sample, self._sample = self._sample, None
+        if sample is not None:
+            sample['duration'] = lag
+            self.stalls.append(sample)
+            self._metrics.inc('loop_stalls_total')
+            _LOGGER.warning("Event loop stalled for %.3f seconds in %s:\n%s",
+                lag, sample['offender'], ''.join(sample['stack']))
+
+        self._schedule(now)
+
+    def _watch(self) -> None:
+        """Sample the stack of the event loop thread when stalled, run in the watcher thread."""
+        while not self._stopping.wait(self.interval):
+            expected = self._expected
+            if monotonic() - expected < self.threshold or self._sampled == expected:
+                continue
+            # Sample each stall once
+            self._sampled = expected
+            frame = sys._current_frames().get(self._thread_id) # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            with self._lock:
+                self._sample = {
+                    'time': time.time(),
+                    'offender': _offender(stack),
+                    'stack': stack.format(),
+                }
+
+    def _collect_metrics(self, metrics : Metrics) -> None:
+        for quantile in LAG_QUANTILES:
+            metrics.set('loop_lag_quantile_seconds', self.lag.quantile(quantile), {'quantile': quantile})
+
+    def recent_stalls(self) -> List[Dict[str, Any]]:
+        """Return the recent stalls, latest first, with their offender and stack sample."""
+        return list(reversed(self.stalls))
@@ -1,3 +1,15 @@
-from .WeeklyHistoricalAverage import WeeklyHistoricalAverage
-from .WeeklyKernelInterpolation import WeeklyKernelInterpolation
-from .WeeklySvr import WeeklySvr
+"""Models of link travel times.
+
+The models are imported on first use, as they depend on scikit-learn and scipy.
+"""
+import importlib
+
+_MODELS = ['WeeklyHistoricalAverage', 'WeeklyKernelInterpolation', 'WeeklySvr']
+
+def __getattr__(name):
+    if name not in _MODELS:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    model_class = getattr(importlib.import_module(f'{__name__}.{name}'), name)
+    # Importing the submodule binds its name, so rebind it to the class
+    globals()[name] = model_class
+    return model_class
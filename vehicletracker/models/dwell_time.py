@@ -3,11 +3,6 @@ import logging
 import numpy as np
 import pandas as pd
 
-import tensorflow as tf
-from tensorflow import keras
-from tensorflow.keras import Model
-from tensorflow.keras.layers import Input, Embedding, Dense, Concatenate, Reshape
-
 _LOGGER = logging.getLogger(__name__)
 
 class DwellTimeModel:
@@ -15,14 +10,33 @@ class DwellTimeModel:
         self.node = node
 
     def dwell_time_from_to(self, from_time, to_time, line_ref = None, stop_point_ref = None):
-        data = self.node.services.call('dwell_time_from_to', {
+        # The model is fit on all rows at once, so they must all be kept. Each
+        # chunk is encoded as it arrives, so only the compact arrays are kept
+        # rather than the decoded chunks, e.g. stop points as integer codes.
+        chunks = self.node.services.call_stream('dwell_time_from_to_stream', {
             'fromTime': from_time,
             'toTime': to_time,
             'lineRef': line_ref
         })
-        if 'error' in data:
-            raise ValueError(data['error'])
-        return data.get('data'), data.get('labels')
+        codes = {}
+        columns = {}
+        for chunk in chunks:
+            chunk['stopPointRef'] = np.fromiter(
+                (codes.setdefault(ref, len(codes)) for ref in chunk['stopPointRef']),
+                dtype=np.int32, count=len(chunk['stopPointRef']))
+            for key, values in chunk.items():
+                columns.setdefault(key, []).append(np.asarray(values))
+
+        if not columns:
+            return {'time': [], 'stopPointRef': [], 'delay': [], 'isTimingPoint': [], 'dwellTime': []}, {'stopPointRef': []}
+        data = {key: np.concatenate(columns.pop(key)) for key in list(columns)}
+
+        # Number the stop points in sorted order, as predictions look them up by bisection
+        stop_point_ref_labels = sorted(codes, key=str)
+        order = np.empty(len(codes), dtype=np.int32)
+        order[[codes[ref] for ref in stop_point_ref_labels]] = np.arange(len(codes), dtype=np.int32)
+        data['stopPointRef'] = order[data['stopPointRef']]
+        return data, {'stopPointRef': stop_point_ref_labels}
 
 class NnMultiStopDwell(DwellTimeModel):
     
@@ -30,6 +44,10 @@ class NnMultiStopDwell(DwellTimeModel):
         self.node = node
     
     def build_model(self, params):
+        # TensorFlow takes seconds to import, so only import it once needed
+        from tensorflow.keras import Model
+        from tensorflow.keras.layers import Input, Embedding, Dense, Concatenate, Reshape
+
         self.stop_point_dim = params.get('stopPointDim', 4)
         self.day_hour_dim =  params.get('dayHourDim', 2)
         
@@ -92,6 +110,8 @@ class NnMultiStopDwell(DwellTimeModel):
         self.keras_model.save(metadata['resourceUrl'])
     
     def restore(self, model_store, metadata):
+        from tensorflow import keras
+
         _LOGGER.info("Restoring model '%s'...", metadata['ref'])
         # model_store.download_to_cache()
         self.stop_point_ref = np.array(metadata['spatialRefs'])
@@ -0,0 +1,127 @@
+"""Transports carrying events between Vehicle Tracker nodes."""
+import importlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_TYPE = 'type'
+
+DEFAULT_TRANSPORT = 'amqp'
+
+# Lanes separate real-time events from service calls and bulk traffic, e.g.
+# training data, so that the latter cannot hold up the former. Each lane may
+# use its own connection, and messages of a lane take precedence over those
+# of any lower priority lane.
+LANE_REALTIME = 'realtime'
+LANE_RPC = 'rpc'
+LANE_BULK = 'bulk'
+
+# Priority of the lanes, the higher the sooner
+LANE_PRIORITY = {
+    LANE_REALTIME: 2,
+    LANE_RPC: 1,
+    LANE_BULK: 0,
+}
+
+TRANSPORTS = {
+    'amqp': 'vehicletracker.transport.amqp.AmqpTransport',
+    'memory': 'vehicletracker.transport.memory.MemoryTransport',
+}
+
+# Coroutine function invoked by a transport for each message consumed from a
+# queue, which returns once the message has been handled:
+# await on_message(event_type, event_data, routing_key, published)
+# where published is the UNIX time the message was published at, if known.
+MESSAGE_CALLBACK_TYPE = Callable[[str, Any, str, Optional[float]], Awaitable[None]]
+# Callback invoked by a transport for each message consumed from a reply queue:
+# on_message(event_type, event_data)
+REPLY_CALLBACK_TYPE = Callable[[str, Any], None]
+
+class Transport:
+    """Base class for the transport underneath the event bus.
+
+    A transport owns a topic exchange and a set of named queues. Queues are
+    bound to the exchange by AMQP style topic patterns, and every message
+    routed to a queue is handed to the callback given at declaration.
+    """
+
+    # Content type of encoded messages, None if messages are not encoded.
+    content_type : Optional[str] = None
+
+    def __init__(self, node, config : Dict[str, Any]) -> None:
+        """Initialize the transport."""
+        self._node = node
+        self._config = config
+
+    async def async_connect(self) -> None:
+        """Connect the transport."""
+        raise NotImplementedError
+
+    async def async_close(self) -> None:
+        """Close the transport."""
+        raise NotImplementedError
+
+    async def async_declare_queue(self, name : str, on_message : MESSAGE_CALLBACK_TYPE, prefetch_count : Optional[int] = None, lane : str = LANE_REALTIME) -> None:
+        """Declare the queue `name` and start consuming from it on `lane`.
+
+        Without a prefetch count messages are consumed as fast as they arrive.
+        With a prefetch count at most that many messages are handled at a time
+        and each is acknowledged once handled, i.e. the rest are left in the
+        queue for this or any other consumer. Messages waiting in the queue
+        are consumed by the priority of their lane.
+        """
+        raise NotImplementedError
+
+    async def async_declare_reply_queue(self, on_message : REPLY_CALLBACK_TYPE, lane : str = LANE_RPC) -> str:
+        """Declare a private queue for replies to this node and start consuming from it on `lane`.
+
+        Returns the name to reply to, i.e. to use with `async_send`.
+        """
+        raise NotImplementedError
+
+    async def async_bind(self, name : str, routing_key : str) -> None:
+        """Bind the queue `name` to the exchange using the topic pattern `routing_key`."""
+        raise NotImplementedError
+
+    async def async_unbind(self, name : str, routing_key : str) -> None:
+        """Remove the binding `routing_key` of the queue `name`."""
+        raise NotImplementedError
+
+    async def async_publish(self, routing_key : str, event_type : str, event_data : Any, lane : str = LANE_REALTIME, expiration : Optional[float] = None) -> None:
+        """Publish an event on the exchange using `routing_key`.
+
+        The event type is carried separately, since the routing key may extend
+        it with further words, e.g. 'estimated_arrival.<line>.<journeyRef>'.
+        Messages not consumed within `expiration` seconds are discarded.
+        """
+        raise NotImplementedError
+
+    async def async_send(self, name : str, event_type : str, event_data : Any, content_type : Optional[str] = None, lane : str = LANE_RPC) -> None:
+        """Send an event directly to the queue `name`, bypassing the exchange.
+
+        The content type requests a specific encoding of the message, if the
+        transport encodes messages at all.
+        """
+        raise NotImplementedError
+
+def validate_lane(lane : str) -> str:
+    """Validate the name of a lane."""
+    if lane not in LANE_PRIORITY:
+        raise ValueError(f"Unknown lane '{lane}'")
+    return lane
+
+def get_transport(node, config : Optional[Dict[str, Any]]) -> Transport:
+    """Create the transport selected in the node configuration."""
+    config = config or {}
+    transport_type = config.get(ATTR_TYPE, DEFAULT_TRANSPORT)
+
+    if transport_type not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{transport_type}'")
+
+    _LOGGER.info("Using '%s' transport.", transport_type)
+
+    # Import lazily so that e.g. aio_pika is only required when used.
+    module_name, class_name = TRANSPORTS[transport_type].rsplit(".", 1)
+    transport_class = getattr(importlib.import_module(module_name), class_name)
+    return transport_class(node, config)
@@ -0,0 +1,119 @@
+"""In-process event bus transport for single-node deployments."""
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from vehicletracker.helpers.topic import topic_matches
+from vehicletracker.transport import (LANE_PRIORITY, LANE_REALTIME, LANE_RPC,
+                                      MESSAGE_CALLBACK_TYPE,
+                                      REPLY_CALLBACK_TYPE, Transport)
+
+_LOGGER = logging.getLogger(__name__)
+
+class _MemoryQueue:
+    """A queue of the in-memory transport, consumed by the priority of the lanes."""
+
+    def __init__(self, node, on_message : MESSAGE_CALLBACK_TYPE, prefetch_count : Optional[int] = None) -> None:
+        self.bindings : List[str] = []
+        self._node = node
+        self._on_message = on_message
+        self._prefetch_count = prefetch_count
+        # There is no broker to leave messages beyond the prefetch count
+        # with, so they wait for their turn here.
+        self._messages : List[Tuple[int, int, Optional[float], Tuple[str, Any, str, float]]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._drain_scheduled = False
+
+    def deliver(self, event_type : str, event_data : Any, routing_key : str, lane : str, expiration : Optional[float] = None) -> None:
+        """Queue a message for the consumer of the queue."""
+        published = time.time()
+        expires = published + expiration if expiration is not None else None
+        # Highest priority first, then first in first out
+        heapq.heappush(self._messages, (-LANE_PRIORITY[lane], next(self._seq), expires, (event_type, event_data, routing_key, published)))
+        if not self._drain_scheduled:
+            # Drain once all messages delivered meanwhile are queued
+            self._drain_scheduled = True
+            self._node.loop.call_soon(self._drain)
+
+    def _drain(self) -> None:
+        """Hand queued messages to the consumer until the prefetch count is reached."""
+        self._drain_scheduled = False
+        while self._messages and (not self._prefetch_count or self._in_flight < self._prefetch_count):
+            _, _, expires, message = heapq.heappop(self._messages)
+            if expires is not None and expires < time.time():
+                # Like the broker, silently discard expired messages
+                continue
+            self._in_flight += 1
+            self._node.async_create_task(self._async_consume(*message))
+
+    async def _async_consume(self, event_type : str, event_data : Any, routing_key : str, published : float) -> None:
+        try:
+            await self._on_message(event_type, event_data, routing_key, published)
+        finally:
+            self._in_flight -= 1
+            self._drain()
+
+class MemoryTransport(Transport):
+    """Transport events between listeners of the same process.
+
+    Event data is handed to listeners as is, i.e. without any encoding and
+    without a broker round trip. Listeners must therefore treat event data
+    as read-only, since it may be shared with the publisher.
+    """
+
+    def __init__(self, node, config : Dict[str, Any]) -> None:
+        """Initialize the transport."""
+        super().__init__(node, config)
+        self._queues : Dict[str, _MemoryQueue] = {}
+        self._reply_queues : Dict[str, REPLY_CALLBACK_TYPE] = {}
+
+    async def async_connect(self) -> None:
+        """Connect the transport."""
+        _LOGGER.info("Using in-memory event transport.")
+
+    async def async_close(self) -> None:
+        """Close the transport."""
+        self._queues.clear()
+        self._reply_queues.clear()
+
+    async def async_declare_queue(self, name : str, on_message : MESSAGE_CALLBACK_TYPE, prefetch_count : Optional[int] = None, lane : str = LANE_REALTIME) -> None:
+        """Declare the queue `name` and start consuming from it."""
+        self._queues[name] = _MemoryQueue(self._node, on_message, prefetch_count)
+
+    async def async_declare_reply_queue(self, on_message : REPLY_CALLBACK_TYPE, lane : str = LANE_RPC) -> str:
+        """Declare a private reply queue, which is not bound to the exchange."""
+        name = 'reply-' + str(uuid.uuid4())
+        self._reply_queues[name] = on_message
+        return name
+
+    async def async_bind(self, name : str, routing_key : str) -> None:
+        """Bind the queue `name` using the topic pattern `routing_key`."""
+        self._queues[name].bindings.append(routing_key)
+
+    async def async_unbind(self, name : str, routing_key : str) -> None:
+        """Remove the binding `routing_key` of the queue `name`."""
+        self._queues[name].bindings.remove(routing_key)
+
+    async def async_publish(self, routing_key : str, event_type : str, event_data : Any, lane : str = LANE_REALTIME, expiration : Optional[float] = None) -> None:
+        """Deliver an event to every queue with a binding matching `routing_key`."""
+        for queue in self._queues.values():
+            if any(topic_matches(binding, routing_key) for binding in queue.bindings):
+                queue.deliver(event_type, event_data, routing_key, lane, expiration)
+
+    async def async_send(self, name : str, event_type : str, event_data : Any, content_type : Optional[str] = None, lane : str = LANE_RPC) -> None:
+        """Deliver an event directly to the queue `name`."""
+        on_reply = self._reply_queues.get(name)
+        if on_reply is not None:
+            self._node.loop.call_soon(on_reply, event_type, event_data)
+            return
+        queue = self._queues.get(name)
+        if queue is None:
+            # Like the default exchange, drop messages to unknown queues.
+            _LOGGER.debug("Dropping event '%s' for unknown queue '%s'.", event_type, name)
+            return
+        # Like the default exchange, the queue name is the routing key.
+        queue.deliver(event_type, event_data, name, lane)